@@ -0,0 +1,149 @@
+import asyncio
+import heapq
+import threading
+from collections import deque
+
+
+# An asyncio version of PriorityQueue.py. Items are ordered the same way, by (-priority, count, item), so items
+# with the same priority come out in the order they were put in. Instead of blocking a thread on a Condition,
+# get() and put() park on a future until there is something to take or room to put.
+class AsyncPriorityQueue:
+    def __init__(self, maxsize=0):
+        self._queue = []
+        self._count = 0
+        self._maxsize = maxsize
+        self._getters = deque()
+        self._putters = deque()
+
+    def qsize(self):
+        return len(self._queue)
+
+    def empty(self):
+        return not self._queue
+
+    def full(self):
+        return self._maxsize > 0 and len(self._queue) >= self._maxsize
+
+    # wake up the first waiter that is still waiting
+    @staticmethod
+    def _wakeup(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    @staticmethod
+    async def _wait(waiters, ready, wakeup):
+        loop = asyncio.get_running_loop()
+        while not ready():
+            waiter = loop.create_future()
+            waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                waiter.cancel()
+                # if we were woken up and then cancelled, pass the wakeup on to the next waiter
+                if ready() and not waiter.cancelled():
+                    wakeup()
+                raise
+
+    def put_nowait(self, item, priority):
+        if self.full():
+            raise asyncio.QueueFull
+        heapq.heappush(self._queue, (-priority, self._count, item))
+        self._count += 1
+        self._wakeup(self._getters)
+
+    async def put(self, item, priority):
+        await self._wait(self._putters, lambda: not self.full(), lambda: self._wakeup(self._putters))
+        self.put_nowait(item, priority)
+
+    def get_nowait(self):
+        if not self._queue:
+            raise asyncio.QueueEmpty
+        item = heapq.heappop(self._queue)[-1]
+        self._wakeup(self._putters)
+        return item
+
+    async def get(self):
+        await self._wait(self._getters, lambda: self._queue, lambda: self._wakeup(self._getters))
+        return self.get_nowait()
+
+
+# Lets plain threads feed an AsyncPriorityQueue. Producers append to a locked buffer, and only the put that
+# finds the buffer empty schedules a drain on the event loop, so a burst of puts costs one call_soon_threadsafe.
+class ThreadSafeBridge:
+    def __init__(self, queue, loop):
+        self._queue = queue
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._buffer = []
+        # items that did not fit in a bounded queue, fed in by a task as room frees up
+        self._backlog = deque()
+        self._feeder = None
+
+    def put(self, item, priority):
+        with self._lock:
+            self._buffer.append((item, priority))
+            schedule = len(self._buffer) == 1
+        if schedule:
+            self._loop.call_soon_threadsafe(self._drain)
+
+    def put_many(self, pairs):
+        with self._lock:
+            schedule = not self._buffer
+            self._buffer.extend(pairs)
+            schedule = schedule and self._buffer
+        if schedule:
+            self._loop.call_soon_threadsafe(self._drain)
+
+    # runs on the event loop
+    def _drain(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        for item, priority in batch:
+            if self._backlog or self._queue.full():
+                self._backlog.append((item, priority))
+            else:
+                self._queue.put_nowait(item, priority)
+        if self._backlog and self._feeder is None:
+            self._feeder = self._loop.create_task(self._feed())
+
+    async def _feed(self):
+        try:
+            while self._backlog:
+                item, priority = self._backlog[0]
+                await self._queue.put(item, priority)
+                self._backlog.popleft()
+        finally:
+            self._feeder = None
+
+
+async def consumer(q, n):
+    for _ in range(n):
+        print(await q.get())
+
+
+async def main():
+    q = AsyncPriorityQueue(maxsize=3)
+    bridge = ThreadSafeBridge(q, asyncio.get_running_loop())
+
+    # a plain thread producing items for the event loop
+    def producer():
+        bridge.put_many([('foo', 1), ('bar', 5), ('spam', 4), ('grok', 1)])
+        bridge.put('last', 0)
+
+    t = threading.Thread(target=producer)
+    t.start()
+    await consumer(q, 5)
+    t.join()
+
+    try:
+        q.get_nowait()
+    except asyncio.QueueEmpty:
+        print('queue is empty')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
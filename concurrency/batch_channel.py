@@ -0,0 +1,179 @@
+from collections import deque
+from queue import Queue
+from threading import Condition, Event, Thread
+import time
+
+# Object that signals shutdown
+_sentinel = object()
+
+
+# A group of items handed to a consumer in one go. Its event is the one completion token for the whole
+# batch, instead of one Event per item like communicationz.py
+class Batch:
+    __slots__ = ('items', '_channel', '_done')
+
+    def __init__(self, items, channel):
+        self.items = items
+        self._channel = channel
+        self._done = Event()
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    # called by the consumer once every item of the batch has been processed
+    def done(self):
+        self._done.set()
+        self._channel._finished(len(self.items))
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+# A producer/consumer channel that moves items in batches. Backpressure works with two watermarks: once
+# `high` items are in flight (sent but not done yet) producers block until consumers bring that down to `low`.
+class BatchChannel:
+    def __init__(self, batch_size=100, high=10000, low=5000):
+        self._batch_size = batch_size
+        self._high = high
+        self._low = low
+        self._batches = deque()
+        self._pending = []
+        self._in_flight = 0
+        self._throttled = False
+        self._closed = False
+        self._cv = Condition()
+
+    def _send(self, items):
+        batch = Batch(items, self)
+        with self._cv:
+            if self._closed:
+                raise ValueError('channel is closed')
+            if self._in_flight >= self._high:
+                self._throttled = True
+            while self._throttled:
+                self._cv.wait()
+            self._in_flight += len(items)
+            self._batches.append(batch)
+            self._cv.notify_all()
+        return batch
+
+    # put one item; it is sent once a full batch has been collected
+    def put(self, item):
+        with self._cv:
+            self._pending.append(item)
+            if len(self._pending) < self._batch_size:
+                return None
+            items, self._pending = self._pending, []
+        return self._send(items)
+
+    # send a list of items as one batch right away and return its completion token
+    def put_many(self, items):
+        return self._send(list(items))
+
+    # send whatever has been collected by put() so far
+    def flush(self):
+        with self._cv:
+            items, self._pending = self._pending, []
+        return self._send(items) if items else None
+
+    def close(self):
+        self.flush()
+        with self._cv:
+            self._closed = True
+            self._batches.append(_sentinel)
+            self._cv.notify_all()
+
+    # returns the next Batch, or _sentinel once the channel is closed. The sentinel is never removed,
+    # so every consumer sees it
+    def get(self):
+        with self._cv:
+            while not self._batches:
+                self._cv.wait()
+            if self._batches[0] is _sentinel:
+                return _sentinel
+            return self._batches.popleft()
+
+    def _finished(self, n):
+        with self._cv:
+            self._in_flight -= n
+            if self._throttled and self._in_flight <= self._low:
+                self._throttled = False
+                self._cv.notify_all()
+            elif self._in_flight == 0:
+                self._cv.notify_all()
+
+    def join(self):
+        # send what put() has collected, then wait for every item sent so far to be done
+        self.flush()
+        with self._cv:
+            self._cv.wait_for(lambda: self._in_flight == 0)
+
+
+def producer(ch, n):
+    for c in range(n):
+        ch.put('Hello from producer ' + str(c))
+    ch.close()
+
+
+def consumer(ch, results):
+    while True:
+        batch = ch.get()
+        # Check for termination
+        if batch is _sentinel:
+            break
+        results.append(len(batch))
+        batch.done()
+
+
+# the pattern from communicationz.py: one Event per item and the producer waits on each of them
+def _event_producer(out_q, n):
+    for c in range(n):
+        evt = Event()
+        out_q.put(('Hello from producer ' + str(c), evt))
+        evt.wait()
+    out_q.put((_sentinel, None))
+
+
+def _event_consumer(in_q, results):
+    while True:
+        data, evt = in_q.get()
+        if data is _sentinel:
+            in_q.put((_sentinel, None))
+            break
+        results.append(1)
+        evt.set()
+
+
+def _run(target_p, target_c, channel, n, consumers):
+    results = []
+    threads = [Thread(target=target_c, args=(channel, results)) for _ in range(consumers)]
+    threads.append(Thread(target=target_p, args=(channel, n)))
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(results) == n
+    return n / (time.perf_counter() - start)
+
+
+def benchmark(consumers=4):
+    print('{:<16}{:>14}{:>14}'.format('items/sec', 'Event/item', 'BatchChannel'))
+    for n in (1000, 10000, 100000, 1000000):
+        old = _run(_event_producer, _event_consumer, Queue(), n, consumers)
+        new = _run(producer, consumer, BatchChannel(), n, consumers)
+        print('{:<16,}{:>14,.0f}{:>14,.0f}'.format(n, old, new))
+
+
+if __name__ == '__main__':
+    ch = BatchChannel(batch_size=3)
+    token = ch.put_many(['a', 'b', 'c'])
+    batch = ch.get()
+    print(list(batch))
+    batch.done()
+    print('batch finished:', token.wait(0))
+
+    benchmark()
@@ -0,0 +1,198 @@
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+import time
+
+# Object that signals shutdown
+_sentinel = object()
+
+
+# Wraps an exception raised by a stage so it can travel down the pipeline and be raised by run()
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+# put/get on the bounded queues that give up once `stop` is set, so no thread is left blocked on a full or
+# empty queue after run() returns or raises. _put returns False and _get returns _sentinel when stopped
+def _put(q, item, stop, poll=0.1):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=poll)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _get(q, stop, poll=0.1):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=poll)
+        except Empty:
+            pass
+    return _sentinel
+
+
+def _apply_batch(func, values):
+    return [func(v) for v in values]
+
+
+# One step of a pipeline. kind='thread' runs func on `workers` threads (good for I/O), kind='process'
+# sends batches of up to `chunksize` items to a pool of `workers` processes (good for CPU heavy work,
+# func must be picklable). maxsize bounds the queue feeding the stage.
+class Stage:
+    def __init__(self, func, workers=1, kind='thread', maxsize=100, chunksize=32):
+        if kind not in ('thread', 'process'):
+            raise ValueError("kind must be 'thread' or 'process'")
+        self.func = func
+        self.workers = workers
+        self.kind = kind
+        self.maxsize = maxsize
+        self.chunksize = chunksize
+        self.name = getattr(func, '__name__', repr(func))
+        self.processed = 0
+        self.busy_time = 0.0
+        self._stats_lock = Lock()
+
+    def _record(self, n, elapsed):
+        with self._stats_lock:
+            self.processed += n
+            self.busy_time += elapsed
+
+
+# Chains stages together with bounded queues, the way producer() and consumer() are chained by hand in
+# communicationz.py. Items are tagged with their position so the output can be put back in input order.
+class Pipeline:
+    def __init__(self, stages, ordered=True):
+        self.stages = stages
+        self.ordered = ordered
+        self._queues = []
+
+    def stats(self):
+        return [{'stage': stage.name,
+                 'queue_depth': q.qsize(),
+                 'processed': stage.processed,
+                 'busy_time': stage.busy_time}
+                for stage, q in zip(self.stages, self._queues)]
+
+    def _worker(self, stage, in_q, out_q, pool, remaining, stop):
+        while True:
+            first = _get(in_q, stop)
+            if first is _sentinel:
+                # put it back for the other workers of this stage
+                _put(in_q, _sentinel, stop)
+                break
+            batch = [first]
+            if pool is not None:
+                # grab whatever else is already waiting so one round trip to the pool covers a batch
+                while len(batch) < stage.chunksize and not in_q.empty():
+                    item = in_q.get()
+                    if item is _sentinel:
+                        _put(in_q, _sentinel, stop)
+                        break
+                    batch.append(item)
+            todo = [(seq, value) for seq, value in batch if not isinstance(value, _Failure)]
+            start = time.perf_counter()
+            results = {}
+            try:
+                if pool is not None:
+                    values = pool.submit(_apply_batch, stage.func, [v for _, v in todo]).result()
+                    results = dict(zip((seq for seq, _ in todo), values))
+                else:
+                    for seq, value in todo:
+                        results[seq] = stage.func(value)
+            except Exception as e:
+                for seq, _ in todo:
+                    results.setdefault(seq, _Failure(e))
+            stage._record(len(todo), time.perf_counter() - start)
+            for seq, value in batch:
+                if not _put(out_q, (seq, results.get(seq, value)), stop):
+                    return
+        # the last worker of a stage to finish passes the shutdown on to the next stage
+        with remaining[1]:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                _put(out_q, _sentinel, stop)
+
+    def run(self, items):
+        self._queues = [Queue(maxsize=stage.maxsize) for stage in self.stages]
+        out_q = Queue(maxsize=self.stages[-1].maxsize if self.stages else 0)
+        queues = self._queues + [out_q]
+        pools = []
+        threads = []
+        stop = Event()
+        for i, stage in enumerate(self.stages):
+            pool = None
+            if stage.kind == 'process':
+                pool = ProcessPoolExecutor(max_workers=stage.workers)
+                pools.append(pool)
+            remaining = [stage.workers, Lock()]
+            for _ in range(stage.workers):
+                threads.append(Thread(target=self._worker, daemon=True,
+                                      args=(stage, queues[i], queues[i + 1], pool, remaining, stop)))
+
+        # an exception from `items` goes down the pipeline like a stage failure and is raised by run()
+        def feed():
+            seq = -1
+            try:
+                for seq, item in enumerate(items):
+                    if not _put(queues[0], (seq, item), stop):
+                        return
+            except Exception as e:
+                _put(queues[0], (seq + 1, _Failure(e)), stop)
+            finally:
+                _put(queues[0], _sentinel, stop)
+
+        threads.append(Thread(target=feed, daemon=True))
+        for t in threads:
+            t.start()
+        try:
+            waiting = {}
+            next_seq = 0
+            while True:
+                result = _get(out_q, stop)
+                if result is _sentinel:
+                    break
+                seq, value = result
+                if isinstance(value, _Failure):
+                    raise value.exc
+                if not self.ordered:
+                    yield value
+                    continue
+                waiting[seq] = value
+                while next_seq in waiting:
+                    yield waiting.pop(next_seq)
+                    next_seq += 1
+        finally:
+            # the caller stopped early or a failure is being raised: let the threads still waiting go
+            stop.set()
+            for pool in pools:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch(n):
+    # pretend to wait on I/O
+    time.sleep(0.001)
+    return n
+
+
+def crunch(n):
+    return sum(i * i for i in range((n % 100) * 1000))
+
+
+def label(n):
+    return 'result ' + str(n)
+
+
+if __name__ == '__main__':
+    p = Pipeline([
+        Stage(fetch, workers=8),
+        Stage(crunch, workers=4, kind='process'),
+        Stage(label),
+    ])
+    start = time.perf_counter()
+    results = list(p.run(range(2000)))
+    print(results[:3], len(results), '{:.2f}s'.format(time.perf_counter() - start))
+    for s in p.stats():
+        print(s)
@@ -0,0 +1,197 @@
+import heapq
+import itertools
+import threading
+import time
+from queue import Empty
+
+_EMPTY = object()
+
+
+# A lock-striped version of PriorityQueue.py. Every thread is given its own shard (round robin, the first time
+# it puts something) so producers only contend with the few threads that share their shard. A get() looks at
+# the head of every shard without locking, then locks just the shard with the best head and pops from it, so
+# items still come out by (-priority, count) across all shards: the best item of the moment, give or take the
+# puts racing with the get. Consumers only touch the condition variable when the queue looks empty, and
+# producers only when somebody is waiting on it.
+class ShardedPriorityQueue:
+    def __init__(self, shards=8):
+        self._shards = [[] for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._lock_of = {id(heap): lock for heap, lock in zip(self._shards, self._locks)}
+        # next() on itertools.count is atomic, so it is a cheap global tiebreaker (and shard dealer)
+        self._count = itertools.count()
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+        self._cv = threading.Condition()
+        self._waiting = 0
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            self._local.shard = next(self._next_shard) % len(self._shards)
+            return self._local.shard
+
+    def _wake(self, n):
+        with self._cv:
+            self._cv.notify(n)
+
+    def put(self, item, priority):
+        i = self._shard()
+        with self._locks[i]:
+            heapq.heappush(self._shards[i], (-priority, next(self._count), item))
+        if self._waiting:
+            self._wake(1)
+
+    def put_many(self, pairs):
+        # pairs is an iterable of (item, priority), all pushed under one lock acquisition
+        entries = [(-priority, next(self._count), item) for item, priority in pairs]
+        if not entries:
+            return
+        i = self._shard()
+        with self._locks[i]:
+            heap = self._shards[i]
+            if len(entries) > len(heap):
+                heap.extend(entries)
+                heapq.heapify(heap)
+            else:
+                for entry in entries:
+                    heapq.heappush(heap, entry)
+        if self._waiting:
+            self._wake(len(entries))
+
+    # pop the best head, or return _EMPTY when every shard is empty. Comparing two heaps compares their heads
+    # first, and the counts make heads unique, so min() over the non-empty heaps picks the one with the best
+    # head, all in C
+    def _try_pop(self):
+        shards = self._shards
+        while True:
+            try:
+                heap = min(filter(None, shards))
+            except ValueError:
+                return _EMPTY
+            with self._lock_of[id(heap)]:
+                if heap:
+                    return heapq.heappop(heap)[-1]
+            # somebody else emptied that shard in the meantime; look again
+
+    # pop up to n items under one lock acquisition: from the shard with the best head, for as long as its items
+    # are better than the best head of the other shards (read without locking, like in _try_pop). Returns [] when
+    # every shard is empty
+    def _try_pop_many(self, n):
+        shards = self._shards
+        while True:
+            try:
+                heap = min(filter(None, shards))
+            except ValueError:
+                return []
+            try:
+                bound = min(h[0] for h in shards if h and h is not heap)
+            except ValueError:
+                bound = None
+            except IndexError:
+                # another shard was emptied while its head was read
+                continue
+            items = []
+            with self._lock_of[id(heap)]:
+                while heap and len(items) < n and (bound is None or heap[0] < bound):
+                    items.append(heapq.heappop(heap)[-1])
+            if items:
+                return items
+
+    def _wait_pop(self, timeout):
+        item = self._try_pop()
+        if item is not _EMPTY:
+            return item
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            self._waiting += 1
+            try:
+                while True:
+                    # checked again after _waiting went up, so a put that saw _waiting == 0 is not missed
+                    item = self._try_pop()
+                    if item is not _EMPTY:
+                        return item
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise Empty
+                    self._cv.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def get(self, timeout=None):
+        item = self._try_pop()
+        if item is not _EMPTY:
+            return item
+        return self._wait_pop(timeout)
+
+    def get_many(self, n, timeout=None):
+        # blocks until at least one item is available, then takes up to n without waiting any more. Every lock
+        # acquisition takes a whole run of items from one shard, so a batch costs one acquisition per run, not one
+        # per item. With one shard that is a single acquisition; when the shards hold the same priorities the
+        # runs get shorter, since keeping items in order across shards means switching shard whenever another
+        # one has the better head
+        result = self._try_pop_many(n) or [self._wait_pop(timeout)]
+        while len(result) < n:
+            items = self._try_pop_many(n - len(result))
+            if not items:
+                break
+            result += items
+        return result
+
+    def qsize(self):
+        return sum(len(heap) for heap in self._shards)
+
+
+# benchmark: every thread puts `ops` items and then gets `ops` items back
+def _run(make_queue, put, get, threads, ops):
+    q = make_queue()
+
+    def work():
+        for i in range(ops):
+            put(q, i, i % 10)
+        for _ in range(ops):
+            get(q)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return (2 * threads * ops) / (time.perf_counter() - start)
+
+
+def benchmark(ops=5000):
+    import queue
+    from PriorityQueue import PriorityQueue
+
+    candidates = {
+        'PriorityQueue': (PriorityQueue,
+                          lambda q, item, p: q.put(item, p),
+                          lambda q: q.get()),
+        'queue.PriorityQueue': (queue.PriorityQueue,
+                                lambda q, item, p: q.put((-p, item)),
+                                lambda q: q.get()),
+        'ShardedPriorityQueue': (ShardedPriorityQueue,
+                                 lambda q, item, p: q.put(item, p),
+                                 lambda q: q.get()),
+    }
+    print('{:<24}{:>12}{:>12}{:>12}{:>12}'.format('ops/sec', 1, 4, 16, 64))
+    for name, (make_queue, put, get) in candidates.items():
+        rates = [_run(make_queue, put, get, threads, ops) for threads in (1, 4, 16, 64)]
+        print('{:<24}'.format(name) + ''.join('{:>12,.0f}'.format(r) for r in rates))
+
+
+if __name__ == '__main__':
+    q = ShardedPriorityQueue()
+    q.put('foo', 1)
+    q.put_many([('bar', 5), ('spam', 4), ('grok', 1)])
+    print(q.get())
+    print(q.get_many(3))
+    try:
+        q.get(timeout=0.1)
+    except Empty:
+        print('queue is empty')
+
+    benchmark()
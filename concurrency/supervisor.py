@@ -0,0 +1,228 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+# Base class for tasks run by a Supervisor. In multiprocessingz.py terminate() only changes the parent's copy
+# of the task; here `running` reads a byte in shared memory that the parent sets, so the child sees it and
+# checking it costs about as much as reading an attribute.
+class CancellableTask:
+    _flags = None
+    _slot = None
+
+    @property
+    def running(self):
+        return self._flags is None or not self._flags[self._slot]
+
+    # sleep, but wake up early if the task gets cancelled. Returns False when it was cancelled
+    def wait(self, seconds, poll=0.005):
+        deadline = time.monotonic() + seconds
+        while self.running:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return True
+            time.sleep(min(poll, left))
+        return False
+
+
+class CountdownTask(CancellableTask):
+    def run(self, n, interval=1):
+        while self.running and n > 0:
+            print('T-minus', n)
+            n -= 1
+            self.wait(interval)
+        return n
+
+
+def _worker(slot, tasks, results, flags):
+    while True:
+        job = tasks.get()
+        if job is None:
+            break
+        task_id, task, args = job
+        task._flags, task._slot = flags, slot
+        try:
+            results.put((slot, task_id, task.run(*args), None))
+        except Exception as e:
+            results.put((slot, task_id, None, e))
+
+
+# Runs task objects on a fixed set of worker processes that are reused from task to task, so the cost of
+# starting a process is only paid again when a worker dies. Every worker slot has one cancellation flag.
+class Supervisor:
+    def __init__(self, workers=4):
+        self._flags = multiprocessing.RawArray('B', workers)
+        self._results = multiprocessing.Queue()
+        self._tasks = [None] * workers
+        self._procs = [None] * workers
+        # what each slot is running: (task_id, future, job) or None when idle
+        self._running = [None] * workers
+        self._backlog = []
+        self._futures = {}
+        self._cancelled_at = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.restarts = 0
+        for slot in range(workers):
+            self._spawn(slot)
+        self._monitor = threading.Thread(target=self._watch, daemon=True)
+        self._monitor.start()
+
+    def _spawn(self, slot):
+        self._tasks[slot] = multiprocessing.Queue()
+        self._procs[slot] = multiprocessing.Process(
+            target=_worker, args=(slot, self._tasks[slot], self._results, self._flags), daemon=True)
+        self._procs[slot].start()
+
+    # hand out waiting tasks to idle workers; called with the lock held. After shutdown() the workers have been
+    # told to stop, so nothing is handed out any more
+    def _dispatch(self):
+        if self._closed:
+            return
+        for slot, current in enumerate(self._running):
+            if not self._backlog:
+                break
+            if current is None:
+                task_id, future, job = self._backlog.pop(0)
+                self._flags[slot] = 0
+                self._running[slot] = (task_id, future, job)
+                self._tasks[slot].put(job)
+
+    def submit(self, task, *args):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('supervisor is shut down')
+            task_id = next(self._ids)
+            future.task_id = task_id
+            self._futures[task_id] = future
+            self._backlog.append((task_id, future, (task_id, task, args)))
+            self._dispatch()
+        return future
+
+    # ask a task to stop; a running task sees it the next time it checks `running`
+    def cancel(self, future):
+        with self._lock:
+            for i, entry in enumerate(self._backlog):
+                if entry[1] is future:
+                    del self._backlog[i]
+                    future.cancel()
+                    return True
+            for slot, current in enumerate(self._running):
+                if current is not None and current[1] is future:
+                    self._cancelled_at[future.task_id] = time.perf_counter()
+                    self._flags[slot] = 1
+                    return True
+        return False
+
+    def _finish(self, slot, task_id, result, exc):
+        with self._lock:
+            current = self._running[slot]
+            if current is None or current[0] != task_id:
+                return
+            self._running[slot] = None
+            future = self._futures.pop(task_id)
+            cancelled_at = self._cancelled_at.pop(task_id, None)
+            if cancelled_at is not None:
+                future.time_to_stop = time.perf_counter() - cancelled_at
+            self._dispatch()
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def _check_workers(self):
+        crashed = []
+        with self._lock:
+            if self._closed:
+                return
+            for slot, proc in enumerate(self._procs):
+                if not proc.is_alive():
+                    current = self._running[slot]
+                    self._running[slot] = None
+                    if current is not None:
+                        self._futures.pop(current[0], None)
+                        self._cancelled_at.pop(current[0], None)
+                        crashed.append((current[1], proc.exitcode))
+                    self.restarts += 1
+                    self._spawn(slot)
+            self._dispatch()
+        for future, exitcode in crashed:
+            future.set_exception(WorkerCrashed('worker exited with code {}'.format(exitcode)))
+
+    # the workers are checked on a timer, not only when no results come in: while other workers keep
+    # reporting, a crashed one would otherwise never be noticed
+    def _watch(self, interval=0.1):
+        next_check = time.monotonic() + interval
+        while True:
+            try:
+                message = self._results.get(timeout=max(0.0, next_check - time.monotonic()))
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if message:
+                self._finish(*message)
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + interval
+
+    # running tasks are asked to stop and their futures get whatever they return; tasks that never started
+    # are cancelled
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            backlog, self._backlog = self._backlog, []
+            for task_id, future, job in backlog:
+                self._futures.pop(task_id, None)
+                future.cancel()
+            for slot, current in enumerate(self._running):
+                if current is not None:
+                    self._flags[slot] = 1
+            for q in self._tasks:
+                q.put(None)
+        for proc in self._procs:
+            proc.join()
+        self._results.put(None)
+        self._monitor.join()
+
+
+class CrashingTask(CancellableTask):
+    def run(self):
+        os._exit(1)
+
+
+if __name__ == '__main__':
+    s = Supervisor(workers=2)
+    f = s.submit(CountdownTask(), 10, 0.5)
+    time.sleep(1.2)
+    s.cancel(f)
+    print('stopped with', f.result(), 'left, time to stop: {:.2f}ms'.format(f.time_to_stop * 1000))
+
+    crash = s.submit(CrashingTask())
+    try:
+        crash.result()
+    except WorkerCrashed as e:
+        print(e)
+    print('restarts:', s.restarts)
+    print(s.submit(CountdownTask(), 2, 0.1).result())
+
+    # time-to-stop over a few runs on warm workers
+    stops = []
+    for _ in range(20):
+        f = s.submit(CountdownTask(), 1000, 1)
+        time.sleep(0.05)
+        s.cancel(f)
+        f.result()
+        stops.append(f.time_to_stop * 1000)
+    print('time to stop: avg {:.2f}ms, max {:.2f}ms'.format(sum(stops) / len(stops), max(stops)))
+    s.shutdown()
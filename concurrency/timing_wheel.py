@@ -0,0 +1,182 @@
+import logging
+import random
+import threading
+import time
+import tracemalloc
+
+log = logging.getLogger(__name__)
+
+
+# A timer sitting in one of the wheel's slots. cancel() takes it out of its slot right away, and also stops it
+# if it is already due and only waiting for the callbacks before it in the same tick
+class Timer:
+    __slots__ = ('expires', 'callback', 'args', 'interval', 'cancelled', '_wheel', '_slot')
+
+    def __init__(self, wheel, expires, callback, args, interval):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+        self._wheel = wheel
+        self._slot = None
+
+    def cancel(self):
+        self._wheel._cancel(self)
+
+    @property
+    def active(self):
+        return self._slot is not None and not self.cancelled
+
+
+# Runs any number of timers on a single thread instead of one thread sleeping per countdown like threadz.py.
+# Level 0 has one slot per tick; each higher level has slots that cover a whole turn of the level below,
+# and its timers are moved down (cascaded) when the lower level wraps around. Each slot is a dict so adding
+# and cancelling a timer are both O(1).
+class TimingWheel:
+    def __init__(self, tick=0.01, bits=8, levels=4):
+        self._tick = tick
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._wheels = [[{} for _ in range(1 << bits)] for _ in range(levels)]
+        self._current = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = time.monotonic()
+
+    def _place(self, timer):
+        delta = timer.expires - self._current
+        for level, wheel in enumerate(self._wheels):
+            if delta < 1 << (self._bits * (level + 1)) or level == len(self._wheels) - 1:
+                slot = wheel[(timer.expires >> (self._bits * level)) & self._mask]
+                break
+        slot[timer] = None
+        timer._slot = slot
+
+    # schedule callback(*args) after `delay` seconds, and then every `interval` seconds if given
+    def call_later(self, delay, callback, *args, interval=None):
+        # deadlines are measured against the clock, not against how far the wheel has got
+        expires = round((time.monotonic() - self._start + delay) / self._tick)
+        interval_ticks = max(1, round(interval / self._tick)) if interval else None
+        with self._lock:
+            timer = Timer(self, max(self._current + 1, expires), callback, args, interval_ticks)
+            self._place(timer)
+        return timer
+
+    def _cancel(self, timer):
+        with self._lock:
+            timer.cancelled = True
+            if timer._slot is not None:
+                del timer._slot[timer]
+                timer._slot = None
+
+    # move forward one tick and return the timers that are due
+    def _advance(self):
+        self._current += 1
+        level = 0
+        # cascade every level whose lower neighbour just wrapped around
+        while level + 1 < len(self._wheels) and (self._current >> (self._bits * level)) & self._mask == 0:
+            level += 1
+            slot = self._wheels[level][(self._current >> (self._bits * level)) & self._mask]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._place(timer)
+        slot = self._wheels[0][self._current & self._mask]
+        due = list(slot)
+        slot.clear()
+        for timer in due:
+            if timer.interval:
+                timer.expires = self._current + timer.interval
+                self._place(timer)
+            else:
+                timer._slot = None
+        return due
+
+    def run(self):
+        while not self._stop.is_set():
+            next_time = self._start + (self._current + 1) * self._tick
+            delay = next_time - time.monotonic()
+            # waiting on the event instead of sleeping means stop() takes effect immediately
+            if delay > 0 and self._stop.wait(delay):
+                break
+            with self._lock:
+                due = self._advance()
+            for timer in due:
+                # a timer may have been cancelled by an earlier callback of this same tick
+                if timer.cancelled:
+                    continue
+                # one failing callback must not take the wheel, and every other timer on it, down with it
+                try:
+                    timer.callback(*timer.args)
+                except Exception:
+                    log.exception('timer callback %r failed', timer.callback)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+# the CountdownTask from terminate_ex.py, but as a timer on a wheel instead of a thread of its own
+class CountdownTask:
+    def __init__(self, wheel, n, interval=1, output=print):
+        self._n = n
+        self._output = output
+        self._timer = wheel.call_later(0, self._step, interval=interval)
+
+    def _step(self):
+        self._output('T-minus', self._n)
+        self._n -= 1
+        if self._n <= 0:
+            self._timer.cancel()
+
+    def terminate(self):
+        self._timer.cancel()
+
+
+def benchmark(timers=100000, tick=0.001, spread=2.0):
+    tracemalloc.start()
+    wheel = TimingWheel(tick=tick)
+    for _ in range(timers):
+        wheel.call_later(random.uniform(1.0, spread), None)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{:,} timers: {:.1f} MB, {:.0f} bytes/timer'.format(timers, memory / 1e6, memory / timers))
+
+    wheel = TimingWheel(tick=tick)
+    fired = []
+    done = threading.Event()
+
+    def fire(target):
+        fired.append(time.monotonic() - target)
+        if len(fired) == timers:
+            done.set()
+
+    wheel.start()
+    for _ in range(timers):
+        delay = random.uniform(1.0, spread)
+        wheel.call_later(delay, fire, time.monotonic() + delay)
+    done.wait()
+    wheel.stop()
+    fired.sort()
+    print('jitter: median {:.2f}ms, p99 {:.2f}ms, max {:.2f}ms'.format(
+        fired[len(fired) // 2] * 1000, fired[int(len(fired) * 0.99)] * 1000, fired[-1] * 1000))
+
+
+if __name__ == '__main__':
+    wheel = TimingWheel(tick=0.1)
+    wheel.start()
+    a = CountdownTask(wheel, 5, interval=0.5)
+    b = CountdownTask(wheel, 10, interval=0.3, output=lambda *args: print('b:', *args))
+    time.sleep(2)
+    b.terminate()
+    time.sleep(1)
+    wheel.stop()
+
+    benchmark()
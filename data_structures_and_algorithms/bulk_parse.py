@@ -0,0 +1,97 @@
+import random
+import re
+import time
+from array import array
+from itertools import compress as _compress
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# what int() and float() accept, minus underscores. Integers are limited to 18 digits so they always fit
+# in a signed 64 bit array; anything longer is reported as invalid
+_INT = re.compile(r'\s*[+-]?\d{1,18}\s*')
+_FLOAT = re.compile(r'\s*[+-]?(?:(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|inf(?:inity)?|nan)\s*', re.IGNORECASE)
+
+
+# filtering_sequence.is_int finds out whether a string is an integer by letting int() raise. Here the whole
+# column is checked with one regular expression through map(), so there is no exception per bad value and
+# the loop runs in C. The result is a typed array (0 where the value is invalid) and a validity mask with
+# one byte per value that can be handed straight to compress().
+def _parse(values, pattern, convert, typecode):
+    values = values if isinstance(values, list) else list(values)
+    mask = bytes(map(bool, map(pattern.fullmatch, values)))
+    good = map(convert, _compress(values, mask))
+    if mask.count(0) == 0:
+        return array(typecode, good), mask
+    result = array(typecode, bytes(array(typecode).itemsize * len(values)))
+    if np is not None:
+        np.frombuffer(result, dtype=typecode)[np.frombuffer(mask, dtype=bool)] = np.fromiter(good, dtype=typecode)
+    else:
+        for i, v in zip(_compress(range(len(values)), mask), good):
+            result[i] = v
+    return result, mask
+
+
+def parse_ints(values):
+    return _parse(values, _INT, int, 'q')
+
+
+def parse_floats(values):
+    return _parse(values, _FLOAT, float, 'd')
+
+
+# like itertools.compress(addresses, more5), but it keeps typed arrays typed and uses NumPy when it is there
+def compress(data, mask):
+    if np is not None and isinstance(data, (array, np.ndarray)):
+        view = np.frombuffer(data, dtype=data.typecode) if isinstance(data, array) else data
+        picked = view[np.frombuffer(bytes(mask), dtype=bool) if not isinstance(mask, np.ndarray) else mask]
+        return array(data.typecode, picked.tobytes()) if isinstance(data, array) else picked
+    if isinstance(data, array):
+        return array(data.typecode, _compress(data, mask))
+    return list(_compress(data, mask))
+
+
+def benchmark(n=1000000, junk=0.3):
+    # filtering_sequence.py runs its examples when it is imported, so only the benchmark imports it
+    from filtering_sequence import is_int
+
+    rand = random.Random(0)
+    choices = ['-', 'N/A', '', 'twelve', '1.5e3']
+    values = [rand.choice(choices) if rand.random() < junk else str(rand.randrange(-10 ** 6, 10 ** 6))
+              for _ in range(n)]
+
+    start = time.perf_counter()
+    old = [int(v) for v in filter(is_int, values)]
+    print('filter(is_int, ...) + int(): {:.3f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    ints, mask = parse_ints(values)
+    new = compress(ints, mask)
+    print('parse_ints + compress:      {:.3f}s'.format(time.perf_counter() - start))
+    assert old == new.tolist()
+
+
+if __name__ == '__main__':
+    values = ['1', '2', '3', '-', '4', 'N/A', '5']
+    ints, ok = parse_ints(values)
+    print(ints.tolist(), list(ok))
+    print(compress(ints, ok))
+    print(parse_floats(['1.5', 'x', '-2e3', 'nan'])[0])
+
+    addresses = [
+        '5412 N CLARK',
+        '5148 N CLARK',
+        '5800 E 58TH',
+        '2122 N CLARK',
+        '5645 N RAVENSWOOD',
+        '1060 W ADDISON',
+        '4801 N BROADWAY',
+        '1039 W GRANVILLE',
+    ]
+    counts, _ = parse_ints(['0', '3', '10', '4', '1', '7', '6', '1'])
+    more5 = bytes(c > 5 for c in counts)
+    print(compress(addresses, more5))
+
+    benchmark()
@@ -0,0 +1,255 @@
+import time
+from bisect import bisect_right
+from collections import deque
+from collections.abc import MutableSequence
+from itertools import accumulate
+
+
+# A list stored as a list of small lists (chunks). del numbers[slice(0, 2)] on a plain list (python_notes4.py)
+# moves every element that is left; here deleting a prefix only moves a `base` offset forward and drops whole
+# chunks, and deleting or inserting in the middle only moves the elements of the chunks involved.
+#
+# ends[c] is the number of elements in chunks[0..c], dead ones included. The first `base` elements are dead
+# (deleted from the front but still stored in the first chunks), and `head` is the first chunk with a live
+# element. ends is fixed lazily from `_dirty` on, so a run of edits pays for one pass over the chunk lengths.
+class ChunkedList(MutableSequence):
+    def __init__(self, iterable=(), chunk_size=1024):
+        self._size = chunk_size
+        self._reset(list(iterable))
+
+    def _reset(self, data):
+        size = self._size
+        self._chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        self._ends = list(accumulate(map(len, self._chunks)))
+        self._dirty = len(self._chunks)
+        self._base = 0
+        self._head = 0
+        self._len = len(data)
+
+    def _fix(self):
+        d = self._dirty
+        if d < len(self._chunks) or len(self._ends) != len(self._chunks):
+            start = self._ends[d - 1] if d else 0
+            self._ends[d:] = list(accumulate(map(len, self._chunks[d:]), initial=start))[1:]
+            self._dirty = len(self._chunks)
+            self._head = bisect_right(self._ends, self._base)
+
+    def _touch(self, c):
+        self._dirty = min(self._dirty, c)
+
+    def _index(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError('ChunkedList index out of range')
+        return i
+
+    # (chunk number, position in that chunk) of element i
+    def _locate(self, i):
+        self._fix()
+        a = i + self._base
+        c = bisect_right(self._ends, a, self._head)
+        return c, a - (self._ends[c - 1] if c else 0)
+
+    def __len__(self):
+        return self._len
+
+    def _iter_range(self, start, stop):
+        if start >= stop:
+            return
+        c, local = self._locate(start)
+        remaining = stop - start
+        chunks = self._chunks
+        while remaining > 0:
+            part = chunks[c][local:local + remaining]
+            yield from part
+            remaining -= len(part)
+            c += 1
+            local = 0
+
+    def __iter__(self):
+        return self._iter_range(0, self._len)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self._len)
+            if step == 1:
+                return self.__class__(self._iter_range(start, stop), self._size)
+            return self.__class__((self[j] for j in range(start, stop, step)), self._size)
+        c, local = self._locate(self._index(i))
+        return self._chunks[c][local]
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self._len)
+            value = list(value)
+            if step == 1:
+                del self[start:stop]
+                self._insert_many(start, value)
+                return
+            indices = range(start, stop, step)
+            if len(indices) != len(value):
+                raise ValueError('attempt to assign sequence of size {} to extended slice of size {}'.format(
+                    len(value), len(indices)))
+            for j, v in zip(indices, value):
+                self[j] = v
+            return
+        c, local = self._locate(self._index(i))
+        self._chunks[c][local] = value
+
+    def __delitem__(self, i):
+        if not isinstance(i, slice):
+            self._delete(self._index(i), 1)
+            return
+        start, stop, step = i.indices(self._len)
+        if step == 1:
+            self._delete(start, stop - start)
+        else:
+            # go from the back so the remaining indices stay put
+            for j in sorted(range(start, stop, step), reverse=True):
+                self._delete(j, 1)
+
+    def _delete(self, start, n):
+        if n <= 0:
+            return
+        if n == self._len:
+            self._reset([])
+            return
+        if start == 0:
+            # deleting a prefix: the elements just become dead and whole dead chunks are skipped
+            self._fix()
+            self._base += n
+            self._len -= n
+            self._head = bisect_right(self._ends, self._base, self._head)
+            if self._head >= 32 and 2 * self._head >= len(self._chunks):
+                self._compact()
+            return
+        c, local = self._locate(start)
+        self._touch(c)
+        self._len -= n
+        chunks = self._chunks
+        while n > 0:
+            chunk = chunks[c]
+            k = min(n, len(chunk) - local)
+            del chunk[local:local + k]
+            n -= k
+            if chunk:
+                c += 1
+            else:
+                del chunks[c]
+                del self._ends[c]
+            local = 0
+
+    # drop the chunks that only hold dead elements
+    def _compact(self):
+        removed = self._ends[self._head - 1]
+        del self._chunks[:self._head]
+        del self._ends[:self._head]
+        self._base -= removed
+        self._head = 0
+        self._dirty = 0
+
+    def _insert_many(self, i, values):
+        if not values:
+            return
+        if i >= self._len:
+            for v in values:
+                self.append(v)
+            return
+        c, local = self._locate(i)
+        chunk = self._chunks[c]
+        chunk[local:local] = values
+        self._len += len(values)
+        self._touch(c)
+        if len(chunk) > 2 * self._size:
+            # split an oversized chunk back into normal sized ones
+            pieces = [chunk[j:j + self._size] for j in range(0, len(chunk), self._size)]
+            self._chunks[c:c + 1] = pieces
+            self._ends[c:c + 1] = [0] * len(pieces)
+
+    def insert(self, i, value):
+        if i < 0:
+            i = max(0, i + self._len)
+        self._insert_many(i, [value])
+
+    def append(self, value):
+        chunks = self._chunks
+        clean = self._dirty == len(chunks) and len(self._ends) == len(chunks)
+        if chunks and len(chunks[-1]) < self._size:
+            chunks[-1].append(value)
+            if clean:
+                self._ends[-1] += 1
+        else:
+            chunks.append([value])
+            if clean:
+                self._ends.append((self._ends[-1] if self._ends else 0) + 1)
+                self._dirty = len(chunks)
+        self._len += 1
+
+    def extend(self, values):
+        for v in values:
+            self.append(v)
+
+    def __repr__(self):
+        return 'ChunkedList({!r})'.format(list(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (ChunkedList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+
+def _time(make, work):
+    seq = make()
+    start = time.perf_counter()
+    work(seq)
+    return time.perf_counter() - start
+
+
+def benchmark(n=2000000, window=1000):
+    # a sliding window: drop `window` elements from the front, over and over, until little is left
+    rounds = n // window - 1
+
+    def drop_front(seq):
+        for _ in range(rounds):
+            del seq[0:window]
+
+    def drop_front_deque(seq):
+        for _ in range(rounds):
+            for _ in range(window):
+                seq.popleft()
+
+    print('prefix deletion, {:,} elements, {:,} at a time'.format(n, window))
+    print('  list:        {:.3f}s'.format(_time(lambda: list(range(n)), drop_front)))
+    print('  deque:       {:.3f}s'.format(_time(lambda: deque(range(n)), drop_front_deque)))
+    print('  ChunkedList: {:.3f}s'.format(_time(lambda: ChunkedList(range(n)), drop_front)))
+
+    def middle(seq):
+        for _ in range(1000):
+            mid = len(seq) // 2
+            del seq[mid:mid + 10]
+            seq.insert(mid, 0)
+
+    # a deque has no slice deletion, so rotate the middle to the front and back again
+    def middle_deque(d):
+        for _ in range(1000):
+            mid = len(d) // 2
+            d.rotate(-mid)
+            for _ in range(10):
+                d.popleft()
+            d.appendleft(0)
+            d.rotate(mid)
+
+    print('middle delete + insert, 1,000 times')
+    print('  list:        {:.3f}s'.format(_time(lambda: list(range(n)), middle)))
+    print('  deque:       {:.3f}s'.format(_time(lambda: deque(range(n)), middle_deque)))
+    print('  ChunkedList: {:.3f}s'.format(_time(lambda: ChunkedList(range(n)), middle)))
+
+
+if __name__ == '__main__':
+    numbers = ChunkedList([1, 2, 3, 4, 5])
+    DELETEDNUMS = slice(0, 2)
+    del numbers[DELETEDNUMS]
+    print(numbers, numbers[0], numbers[-1], numbers[1:])
+
+    benchmark()
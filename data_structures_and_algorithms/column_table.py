@@ -0,0 +1,285 @@
+import operator
+import random
+import time
+import tracemalloc
+from array import array
+from itertools import compress, repeat
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_OPS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+# With NumPy installed the array.array buffers are viewed as NumPy arrays without copying, so masks, compress,
+# take and sort run as NumPy operations. Without it the loops still run in C through map() and compress().
+def _view(data):
+    return np.frombuffer(data, dtype=data.typecode) if np is not None and len(data) else None
+
+
+def _to_array(typecode, values):
+    result = array(typecode)
+    result.frombytes(values.astype(typecode, copy=False).tobytes())
+    return result
+
+
+def _take(data, indices):
+    view = _view(data)
+    if view is not None:
+        return _to_array(data.typecode, view[np.asarray(indices, dtype=np.intp)])
+    return array(data.typecode, map(data.__getitem__, indices))
+
+
+def _compress(data, mask):
+    view = _view(data)
+    if view is not None:
+        return _to_array(data.typecode, view[np.asarray(mask, dtype=bool)])
+    return array(data.typecode, compress(data, mask))
+
+
+# A column of numbers stored in an array.array: 8 bytes a value instead of a Python object each
+class NumberColumn:
+    def __init__(self, values, typecode=None):
+        if typecode is None:
+            typecode = 'd' if any(isinstance(v, float) for v in values) else 'q'
+        self.data = array(typecode, values)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return self.data[i]
+
+    def values(self):
+        return self.data.tolist()
+
+    def mask(self, op, value):
+        view = _view(self.data)
+        if view is not None:
+            return _OPS[op](view, value)
+        # map() with an operator function runs the whole comparison loop in C
+        return list(map(_OPS[op], self.data, repeat(value)))
+
+    def sort_keys(self):
+        return self.data
+
+    def take(self, indices):
+        col = NumberColumn.__new__(NumberColumn)
+        col.data = _take(self.data, indices)
+        return col
+
+    def compress(self, mask):
+        col = NumberColumn.__new__(NumberColumn)
+        col.data = _compress(self.data, mask)
+        return col
+
+    def nbytes(self):
+        return self.data.itemsize * len(self.data)
+
+
+# A column of strings stored dictionary encoded: every distinct string is kept once and the rows hold
+# a small integer code. Comparing against a single string only has to look it up once.
+class StringColumn:
+    def __init__(self, values):
+        self.strings = []
+        self.codes_of = {}
+        self.codes = array('I')
+        for v in values:
+            code = self.codes_of.get(v)
+            if code is None:
+                code = self.codes_of[v] = len(self.strings)
+                self.strings.append(v)
+            self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.strings[self.codes[i]]
+
+    def values(self):
+        return list(map(self.strings.__getitem__, self.codes))
+
+    def mask(self, op, value):
+        view = _view(self.codes)
+        if op in ('==', '!='):
+            code = self.codes_of.get(value, -1)
+            if view is not None:
+                return _OPS[op](view, code)
+            return list(map(_OPS[op], self.codes, repeat(code)))
+        # otherwise decide once per distinct string, then look the answer up per row
+        if op == 'in':
+            hits = list(map(set(value).__contains__, self.strings))
+        else:
+            hits = list(map(_OPS[op], self.strings, repeat(value)))
+        if view is not None:
+            return np.array(hits, dtype=bool)[view]
+        return list(map(hits.__getitem__, self.codes))
+
+    def sort_keys(self):
+        # rank the distinct strings once, then sort the rows by rank
+        ranks = array('I', bytes(4 * len(self.strings)))
+        for rank, code in enumerate(sorted(range(len(self.strings)), key=self.strings.__getitem__)):
+            ranks[code] = rank
+        return _take(ranks, self.codes)
+
+    def _with_codes(self, codes):
+        col = StringColumn.__new__(StringColumn)
+        col.strings = self.strings
+        col.codes_of = self.codes_of
+        col.codes = codes
+        return col
+
+    def take(self, indices):
+        return self._with_codes(_take(self.codes, indices))
+
+    def compress(self, mask):
+        return self._with_codes(_compress(self.codes, mask))
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes) + sum(len(s) + 49 for s in self.strings)
+
+
+# A table stored column by column, instead of the list of dicts used for portfolio and rows in
+# python_notes3.py and groupingRecordsTogether.py. Every operation returns a new table.
+class ColumnTable:
+    def __init__(self, columns):
+        self.columns = dict(columns)
+        lengths = {len(c) for c in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError('columns have different lengths')
+
+    @classmethod
+    def from_rows(cls, rows, fields=None):
+        rows = list(rows)
+        if fields is None:
+            fields = list(rows[0]) if rows else []
+        columns = {}
+        for field in fields:
+            values = [row[field] for row in rows]
+            if all(isinstance(v, str) for v in values):
+                columns[field] = StringColumn(values)
+            else:
+                columns[field] = NumberColumn(values)
+        return cls(columns)
+
+    # a plain dict like prices = {'ACME': 45.23, ...} becomes a two column table
+    @classmethod
+    def from_dict(cls, mapping, key='name', value='value'):
+        return cls.from_rows(({key: k, value: v} for k, v in mapping.items()), [key, value])
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, i):
+        return {name: col[i] for name, col in self.columns.items()}
+
+    def __iter__(self):
+        return iter(self.to_rows())
+
+    def to_rows(self):
+        names = list(self.columns)
+        return [dict(zip(names, values)) for values in zip(*(c.values() for c in self.columns.values()))]
+
+    def column(self, name):
+        return self.columns[name].values()
+
+    def mask(self, name, op, value):
+        return self.columns[name].mask(op, value)
+
+    def compress(self, mask):
+        return ColumnTable({name: col.compress(mask) for name, col in self.columns.items()})
+
+    def filter(self, name, op, value):
+        return self.compress(self.mask(name, op, value))
+
+    def take(self, indices):
+        return ColumnTable({name: col.take(indices) for name, col in self.columns.items()})
+
+    def sort(self, by, reverse=False):
+        keys = self.columns[by].sort_keys()
+        view = _view(keys)
+        if view is None:
+            return self.take(sorted(range(len(self)), key=keys.__getitem__, reverse=reverse))
+        if not reverse:
+            return self.take(np.argsort(view, kind='stable'))
+        # a stable descending sort: sort the reversed keys and map the positions back
+        return self.take((len(view) - 1 - np.argsort(view[::-1], kind='stable'))[::-1])
+
+    def select(self, *names):
+        return ColumnTable({name: self.columns[name] for name in names})
+
+    def nbytes(self):
+        return sum(col.nbytes() for col in self.columns.values())
+
+
+def _measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def benchmark(rows=1000000):
+    rand = random.Random(0)
+    names = ['S%d' % i for i in range(5000)]
+    data = [{'name': rand.choice(names), 'shares': rand.randrange(1000), 'price': round(rand.uniform(1, 1000), 2)}
+            for _ in range(rows)]
+
+    dicts, dict_size = _measure(lambda: [dict(row) for row in data])
+    table, table_size = _measure(lambda: ColumnTable.from_rows(data))
+    print('memory: list of dicts {:.0f} bytes/row, ColumnTable {:.0f} bytes/row'.format(
+        dict_size / rows, table_size / rows))
+
+    start = time.perf_counter()
+    a = [row for row in dicts if row['price'] > 500]
+    middle = time.perf_counter()
+    b = table.filter('price', '>', 500)
+    end = time.perf_counter()
+    print('filter price > 500: dicts {:.3f}s, table {:.3f}s'.format(middle - start, end - middle))
+    assert len(a) == len(b)
+
+    start = time.perf_counter()
+    a = [row for row in dicts if row['name'] == 'S42']
+    middle = time.perf_counter()
+    b = table.filter('name', '==', 'S42')
+    end = time.perf_counter()
+    print("filter name == 'S42': dicts {:.3f}s, table {:.3f}s".format(middle - start, end - middle))
+    assert a == b.to_rows()
+
+    start = time.perf_counter()
+    a = sorted(dicts, key=lambda row: row['price'])
+    middle = time.perf_counter()
+    b = table.sort('price')
+    end = time.perf_counter()
+    print('sort by price: dicts {:.3f}s, table {:.3f}s'.format(middle - start, end - middle))
+    assert a[0] == b[0]
+
+
+if __name__ == '__main__':
+    portfolio = ColumnTable.from_rows([
+        {'name': 'IBM', 'shares': 100, 'price': 91.1},
+        {'name': 'AAPL', 'shares': 50, 'price': 543.22},
+        {'name': 'FB', 'shares': 200, 'price': 21.09},
+        {'name': 'HPQ', 'shares': 35, 'price': 31.75},
+        {'name': 'YHOO', 'shares': 45, 'price': 16.35},
+        {'name': 'ACME', 'shares': 75, 'price': 115.65}
+    ])
+    print(portfolio.filter('price', '>', 50).sort('name').select('name', 'price').to_rows())
+
+    prices = ColumnTable.from_dict({'ACME': 45.23, 'AAPL': 612.78, 'IBM': 205.55, 'HPQ': 37.20, 'FB': 10.75},
+                                   value='price')
+    tech = prices.filter('name', 'in', {'AAPL', 'IBM', 'HPQ', 'MSFT'})
+    print(dict(zip(tech.column('name'), tech.column('price'))))
+
+    benchmark()
@@ -0,0 +1,191 @@
+import random
+import time
+from collections.abc import MutableMapping
+
+_missing = object()
+
+
+# dict_notes.py compares dictionaries with a.keys() & b.keys(), a.keys() - b.keys() and a.items() & b.items(),
+# and each of those builds a whole temporary set. This walks each dict once and yields the differences as
+#   ('added', key, new), ('removed', key, old) or ('changed', key, old, new)
+def diff(a, b):
+    get = b.get
+    for key, old in a.items():
+        new = get(key, _missing)
+        if new is _missing:
+            yield 'removed', key, old
+        elif new is not old and new != old:
+            yield 'changed', key, old, new
+    for key, new in b.items():
+        if key not in a:
+            yield 'added', key, new
+
+
+# A copy of a dict split into buckets by key hash, with a content hash per bucket. The bucket hash is the
+# XOR of hash((key, value)) over its entries, so two snapshots whose bucket hashes match are (almost certainly)
+# equal there and diff_snapshots() can skip the bucket without looking at its entries. Values must be hashable.
+#
+# Building one walks the whole dict, which costs more than a plain diff(). The point is to build it once and
+# then make every next snapshot with updated(), from the changes of a TrackedDict: that only copies and
+# rehashes the buckets the changes fall in, and shares all the others with the snapshot it came from.
+class Snapshot:
+    def __init__(self, mapping, buckets=4096):
+        self.buckets = [{} for _ in range(buckets)]
+        self.hashes = [0] * buckets
+        for key, value in mapping.items():
+            i = hash(key) % buckets
+            self.buckets[i][key] = value
+            self.hashes[i] ^= hash((key, value))
+
+    def __len__(self):
+        return sum(len(b) for b in self.buckets)
+
+    # a new snapshot with the changes applied, as given by diff() or TrackedDict.changes()/checkpoint() against
+    # the dict this snapshot was taken of. This snapshot is left as it is
+    def updated(self, changes):
+        new = object.__new__(Snapshot)
+        new.buckets = list(self.buckets)
+        new.hashes = list(self.hashes)
+        n = len(new.buckets)
+        copied = set()
+        for change in changes:
+            kind, key = change[0], change[1]
+            i = hash(key) % n
+            if i not in copied:
+                new.buckets[i] = dict(new.buckets[i])
+                copied.add(i)
+            bucket = new.buckets[i]
+            if kind != 'added':
+                new.hashes[i] ^= hash((key, change[2]))
+                del bucket[key]
+            if kind != 'removed':
+                new.hashes[i] ^= hash((key, change[-1]))
+                bucket[key] = change[-1]
+        return new
+
+
+def diff_snapshots(a, b):
+    if len(a.buckets) != len(b.buckets):
+        raise ValueError('snapshots have a different number of buckets')
+    for i, (ha, hb) in enumerate(zip(a.hashes, b.hashes)):
+        if ha != hb:
+            yield from diff(a.buckets[i], b.buckets[i])
+
+
+# A dict that remembers what each key held before it was first changed since the last checkpoint(), so
+# the diff against the last checkpoint costs as much as the number of changed keys, not the size of the dict.
+class TrackedDict(MutableMapping):
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+        self._before = {}
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        if key not in self._before:
+            self._before[key] = self._data.get(key, _missing)
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._before:
+            self._before[key] = self._data[key]
+        del self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return 'TrackedDict({!r})'.format(self._data)
+
+    # the changes since the last checkpoint, without starting a new one
+    def changes(self):
+        for key, old in self._before.items():
+            new = self._data.get(key, _missing)
+            if old is _missing:
+                if new is not _missing:
+                    yield 'added', key, new
+            elif new is _missing:
+                yield 'removed', key, old
+            elif new is not old and new != old:
+                yield 'changed', key, old, new
+
+    def checkpoint(self):
+        result = list(self.changes())
+        self._before = {}
+        return result
+
+
+def benchmark(size=1000000, changes=100):
+    rand = random.Random(0)
+    a = {'S%d' % i: round(rand.uniform(1, 1000), 2) for i in range(size)}
+    b = dict(a)
+    tracked = TrackedDict(a)
+    for i in rand.sample(range(size), changes):
+        b['S%d' % i] += 1
+        tracked['S%d' % i] += 1
+    del b['S0']
+    del tracked['S0']
+    b['NEW'] = tracked['NEW'] = 1.0
+
+    start = time.perf_counter()
+    common = a.keys() & b.keys()
+    added = b.keys() - a.keys()
+    removed = a.keys() - b.keys()
+    same = a.items() & b.items()
+    print('key/item sets:    {:.3f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    result = list(diff(a, b))
+    print('diff():           {:.3f}s ({} differences)'.format(time.perf_counter() - start, len(result)))
+    assert len(result) == len(added) + len(removed) + len(common) - len(same)
+
+    # a snapshot built from scratch every time costs more than the diff() it is meant to save
+    start = time.perf_counter()
+    sa = Snapshot(a)
+    print('Snapshot(a):      {:.3f}s'.format(time.perf_counter() - start))
+    start = time.perf_counter()
+    sb = Snapshot(b)
+    result = list(diff_snapshots(sa, sb))
+    print('Snapshot(b) + diff_snapshots(): {:.3f}s ({} differences)'.format(
+        time.perf_counter() - start, len(result)))
+
+    start = time.perf_counter()
+    changes = tracked.checkpoint()
+    print('checkpoint():     {:.6f}s ({} differences)'.format(time.perf_counter() - start, len(changes)))
+
+    # the next snapshot made from the checkpoint instead
+    start = time.perf_counter()
+    sb = sa.updated(changes)
+    result = list(diff_snapshots(sa, sb))
+    print('sa.updated(changes) + diff_snapshots(): {:.4f}s ({} differences)'.format(
+        time.perf_counter() - start, len(result)))
+    assert sorted(map(repr, result)) == sorted(map(repr, changes))
+
+
+if __name__ == '__main__':
+    a = {
+        'x': 1,
+        'y': 2,
+        'z': 3
+    }
+
+    b = {
+        'w': 10,
+        'x': 11,
+        'y': 2
+    }
+    for change in diff(a, b):
+        print(change)
+
+    prices = TrackedDict(a)
+    prices['x'] = 5
+    prices['x'] = 1
+    prices['w'] = 10
+    del prices['z']
+    print(prices.checkpoint())
+
+    benchmark()
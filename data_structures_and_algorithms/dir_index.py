@@ -0,0 +1,190 @@
+import base64
+import json
+import os
+import sys
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from itertools import chain
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+# One directory's listing, stored as parallel arrays instead of an object per file
+class _Listing:
+    __slots__ = ('mtime', 'names', 'sizes', 'mtimes', 'is_dir')
+
+    def __init__(self, mtime, names, sizes, mtimes, is_dir):
+        self.mtime = mtime
+        self.names = names
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.is_dir = is_dir
+
+    # plain JSON data for the cache file: the arrays go in as base64 of their bytes
+    def dump(self):
+        return [self.mtime, self.names, base64.b64encode(self.sizes.tobytes()).decode(),
+                base64.b64encode(self.mtimes.tobytes()).decode(), base64.b64encode(self.is_dir).decode()]
+
+    @classmethod
+    def load(cls, state):
+        mtime, names, sizes, mtimes, is_dir = state
+        listing = cls(int(mtime), [str(name) for name in names], array('q'), array('q'), base64.b64decode(is_dir))
+        listing.sizes.frombytes(base64.b64decode(sizes))
+        listing.mtimes.frombytes(base64.b64decode(mtimes))
+        if not len(listing.names) == len(listing.sizes) == len(listing.mtimes) == len(listing.is_dir):
+            raise ValueError('listing arrays differ in length')
+        return listing
+
+
+def _list_dir(path):
+    names = []
+    sizes = array('q')
+    mtimes = array('q')
+    is_dir = bytearray()
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                st = entry.stat(follow_symlinks=False)
+                directory = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            names.append(entry.name)
+            sizes.append(st.st_size)
+            mtimes.append(st.st_mtime_ns)
+            is_dir.append(directory)
+    return names, sizes, mtimes, bytes(is_dir)
+
+
+# An index of every file under a directory, so questions like the one in generator_expression.py
+# ("are there any .py files?") are answered from memory instead of calling os.listdir() every time.
+# Directories are read with os.scandir on a pool of threads and the index is saved to a compressed cache
+# file. The cache is JSON, not pickle, so a cache file planted by someone else can not run code; one that does
+# not parse is ignored. A rescan only reads the directories whose mtime changed since the last scan; the others are only
+# stat()ed. A directory's mtime changes when entries are added, removed or renamed, but not when a file in
+# it is rewritten, so sizes and mtimes of files in unchanged directories can be out of date.
+class DirIndex:
+    def __init__(self, root, cache_path=None, workers=16):
+        self.root = os.path.abspath(root)
+        self.cache_path = cache_path
+        self.workers = workers
+        self._dirs = {}
+        self._by_suffix = None
+        self.rescanned = 0
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    state = json.loads(zlib.decompress(f.read()))
+                if state['root'] == self.root:
+                    self._dirs = {str(path): _Listing.load(listing) for path, listing in state['dirs'].items()}
+            except (OSError, ValueError, KeyError, TypeError, AttributeError, zlib.error):
+                self._dirs = {}
+
+    def save(self):
+        if self.cache_path:
+            state = {'root': self.root, 'dirs': {path: listing.dump() for path, listing in self._dirs.items()}}
+            data = zlib.compress(json.dumps(state).encode())
+            tmp = self.cache_path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self.cache_path)
+
+    def _visit(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return path, None, False
+        old = self._dirs.get(path)
+        if old is not None and old.mtime == mtime:
+            return path, old, False
+        try:
+            listing = _Listing(mtime, *_list_dir(path))
+        except OSError:
+            return path, None, False
+        return path, listing, True
+
+    def scan(self):
+        seen = {}
+        self.rescanned = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(self._visit, self.root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, listing, rescanned = future.result()
+                    if listing is None:
+                        continue
+                    seen[path] = listing
+                    self.rescanned += rescanned
+                    for name, directory in zip(listing.names, listing.is_dir):
+                        if directory:
+                            pending.add(pool.submit(self._visit, os.path.join(path, name)))
+        # directories that are gone simply are not carried over
+        self._dirs = seen
+        self._by_suffix = None
+        self.save()
+        return self
+
+    # files by what follows the last '.' in their name (from the '.' on, so '.py' and 'a.tar.gz' are under
+    # '.py' and '.gz'). A name that ends with a suffix containing a '.' has the same last '.', so only that
+    # list is searched; a suffix that is all extension, like '.py', matches the whole list
+    def _suffix_index(self):
+        if self._by_suffix is None:
+            index = defaultdict(list)
+            for path, listing in self._dirs.items():
+                for name, directory in zip(listing.names, listing.is_dir):
+                    if not directory:
+                        dot = name.rfind('.')
+                        index[name[dot:] if dot >= 0 else ''].append(os.path.join(path, name))
+            self._by_suffix = index
+        return self._by_suffix
+
+    # the files whose name ends with suffix, like name.endswith(suffix)
+    def _with_suffix(self, suffix):
+        index = self._suffix_index()
+        if '/' in suffix or os.sep in suffix:
+            return iter(())
+        dot = suffix.rfind('.')
+        if dot == 0:
+            return iter(index.get(suffix, ()))
+        candidates = index.get(suffix[dot:], ()) if dot > 0 else chain.from_iterable(index.values())
+        return (path for path in candidates if path.endswith(suffix))
+
+    def any_suffix(self, suffix):
+        return any(True for _ in self._with_suffix(suffix))
+
+    def files_with_suffix(self, suffix):
+        return list(self._with_suffix(suffix))
+
+    def files(self):
+        for path, listing in self._dirs.items():
+            for name, size, mtime, directory in zip(listing.names, listing.sizes, listing.mtimes, listing.is_dir):
+                if not directory:
+                    yield os.path.join(path, name), size, mtime
+
+    def __len__(self):
+        return sum(len(listing.names) - sum(listing.is_dir) for listing in self._dirs.values())
+
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else '../'
+    # in the user's own cache directory, not in the shared temp directory
+    cache_dir = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'python_notes')
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    cache = os.path.join(cache_dir, 'dir_index_cache.json.z')
+
+    start = time.perf_counter()
+    index = DirIndex(root, cache).scan()
+    print('scan: {:,} files in {:.3f}s ({} directories read)'.format(
+        len(index), time.perf_counter() - start, index.rescanned))
+
+    start = time.perf_counter()
+    index = DirIndex(root, cache).scan()
+    print('rescan from cache: {:.3f}s ({} directories read)'.format(time.perf_counter() - start, index.rescanned))
+
+    start = time.perf_counter()
+    if index.any_suffix('.py'):
+        print('There be python!', len(index.files_with_suffix('.py')), 'files')
+    else:
+        print('Sorry, no python!')
+    print('query: {:.3f}s'.format(time.perf_counter() - start))
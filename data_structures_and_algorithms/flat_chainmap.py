@@ -0,0 +1,159 @@
+import time
+from collections import ChainMap
+
+
+# A ChainMap that keeps a flattened copy of the whole chain in one dict, so a lookup is a single dict lookup
+# instead of one per mapping (a miss in collections.ChainMap walks every mapping).
+#
+# Every chain made from this one with new_child() or parents shares a clock that is bumped on every write.
+# Each chain remembers the clock value its cache was built at, so finding out that a cache is stale is one
+# integer compare. Writes to the chain's own first mapping update its cache in place and keep it valid.
+# Changes made directly to the underlying dicts are not seen; call invalidate() after making them.
+class FlatChainMap(ChainMap):
+    def __init__(self, *maps, _clock=None, _parent=None):
+        super().__init__(*maps)
+        self._clock = _clock if _clock is not None else [0]
+        self._parent = _parent
+        self._flat = None
+        self._built = -1
+
+    def _cache(self):
+        if self._flat is None or self._built != self._clock[0]:
+            parent = self._parent
+            if (parent is not None and parent._flat is not None and parent._built == self._clock[0]
+                    and len(parent.maps) == len(self.maps) - 1):
+                # copying the parent's cache is one C level dict copy, much less than merging every mapping
+                flat = dict(parent._flat)
+                flat.update(self.maps[0])
+            else:
+                flat = {}
+                for mapping in reversed(self.maps):
+                    flat.update(mapping)
+            self._flat = flat
+            self._built = self._clock[0]
+        return self._flat
+
+    def invalidate(self):
+        self._clock[0] += 1
+
+    def __getitem__(self, key):
+        try:
+            return self._cache()[key]
+        except KeyError:
+            return self.__missing__(key)
+
+    def get(self, key, default=None):
+        return self._cache().get(key, default)
+
+    def __contains__(self, key):
+        return key in self._cache()
+
+    def __len__(self):
+        return len(self._cache())
+
+    def __iter__(self):
+        return iter(self._cache())
+
+    def __bool__(self):
+        return bool(self._cache())
+
+    def __setitem__(self, key, value):
+        fresh = self._flat is not None and self._built == self._clock[0]
+        self.maps[0][key] = value
+        self._clock[0] += 1
+        if fresh:
+            self._flat[key] = value
+            self._built = self._clock[0]
+
+    def __delitem__(self, key):
+        fresh = self._flat is not None and self._built == self._clock[0]
+        super().__delitem__(key)
+        self._clock[0] += 1
+        if fresh:
+            # only this key has to be looked up again, in the mappings further down
+            for mapping in self.maps[1:]:
+                if key in mapping:
+                    self._flat[key] = mapping[key]
+                    break
+            else:
+                del self._flat[key]
+            self._built = self._clock[0]
+
+    def popitem(self):
+        item = super().popitem()
+        self.invalidate()
+        return item
+
+    def pop(self, key, *args):
+        result = super().pop(key, *args)
+        self.invalidate()
+        return result
+
+    def clear(self):
+        super().clear()
+        self.invalidate()
+
+    # ChainMap's |= updates maps[0] directly, not through __setitem__. update() and setdefault() do go
+    # through it, and | works on a copy
+    def __ior__(self, other):
+        super().__ior__(other)
+        self.invalidate()
+        return self
+
+    def new_child(self, m=None, **kwargs):
+        if m is None:
+            m = kwargs
+        elif kwargs:
+            m.update(kwargs)
+        return self.__class__(m, *self.maps, _clock=self._clock, _parent=self)
+
+    @property
+    def parents(self):
+        if self._parent is not None and len(self._parent.maps) == len(self.maps) - 1:
+            return self._parent
+        return self.__class__(*self.maps[1:], _clock=self._clock)
+
+    def copy(self):
+        # the copy still shares maps[1:], so it has to share the clock too to see writes made through them
+        return self.__class__(self.maps[0].copy(), *self.maps[1:], _clock=self._clock)
+
+    __copy__ = copy
+
+
+def _lookup_time(chain, keys, repeat=20000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for key in keys:
+            chain.get(key)
+    return (time.perf_counter() - start) / (repeat * len(keys)) * 1e9
+
+
+def benchmark():
+    print('{:>6}{:>24}{:>28}'.format('depth', 'ChainMap ns/lookup', 'FlatChainMap ns/lookup'))
+    for depth in (1, 10, 100, 1000):
+        plain = ChainMap({'root': 0})
+        flat = FlatChainMap({'root': 0})
+        for i in range(depth - 1):
+            plain = plain.new_child({'k%d' % i: i})
+            flat = flat.new_child({'k%d' % i: i})
+        # one key from the outermost scope and one that is missing everywhere
+        keys = ['root', 'missing']
+        print('{:>6}{:>24.0f}{:>28.0f}'.format(depth, _lookup_time(plain, keys), _lookup_time(flat, keys)))
+
+
+if __name__ == '__main__':
+    my_a = {'x': 1, 'y': 2}
+    my_b = {'y': 2, 'z': 4}
+
+    my_c = FlatChainMap(my_a, my_b)
+
+    # add a new mapping
+    my_c = my_c.new_child()
+    my_c['j'] = 3
+    print(my_c['j'], my_c['z'])
+
+    # discard last mapping
+    my_c = my_c.parents
+    print(my_c, 'j' in my_c)
+
+    benchmark()
@@ -0,0 +1,211 @@
+import random
+import time
+import tracemalloc
+from array import array
+from collections import defaultdict
+from itertools import chain, repeat
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _group(codes, values, nkeys, unique):
+    # order the values by key code, keeping each key's values in the order they were added
+    # (or sorted and without duplicates when unique=True)
+    if np is not None and len(codes):
+        c = np.frombuffer(codes, dtype=codes.typecode)
+        v = np.frombuffer(values, dtype=values.typecode)
+        order = np.lexsort((v, c)) if unique else np.argsort(c, kind='stable')
+        c, v = c[order], v[order]
+        if unique:
+            keep = np.ones(len(c), dtype=bool)
+            keep[1:] = (c[1:] != c[:-1]) | (v[1:] != v[:-1])
+            c, v = c[keep], v[keep]
+        counts = np.bincount(c, minlength=nkeys)
+        offsets = array('q', bytes(8))
+        offsets.frombytes(np.cumsum(counts, dtype=np.int64).tobytes())
+        grouped = array(values.typecode)
+        grouped.frombytes(v.tobytes())
+        return offsets, grouped
+    buckets = [[] for _ in range(nkeys)]
+    for code, value in zip(codes, values):
+        buckets[code].append(value)
+    if unique:
+        buckets = [sorted(set(b)) for b in buckets]
+    offsets = array('q', [0])
+    total = 0
+    for b in buckets:
+        total += len(b)
+        offsets.append(total)
+    return offsets, array(values.typecode, chain.from_iterable(buckets))
+
+
+# A read-only multidict (see multidict.py) laid out like a compressed sparse row matrix: one dict from key
+# to key number, one offsets array and one flat array of values. The values of key number i are
+# values[offsets[i]:offsets[i + 1]]. Instead of a Python list or set per key there are only the two arrays,
+# and lookups return memoryview slices of them without copying.
+class FrozenMultiDict:
+    def __init__(self, keys, offsets, values):
+        self._index = keys
+        self._offsets = offsets
+        self._values = values
+        self._view = memoryview(values)
+
+    # build from (key, value) pairs. Values must fit the array typecode; unique=True gives set semantics
+    @classmethod
+    def from_pairs(cls, pairs, typecode='q', unique=False):
+        index = {}
+        codes = array('I')
+        values = array(typecode)
+        for key, value in pairs:
+            code = index.get(key)
+            if code is None:
+                code = index[key] = len(index)
+            codes.append(code)
+            values.append(value)
+        offsets, grouped = _group(codes, values, len(index), unique)
+        return cls(index, offsets, grouped)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __getitem__(self, key):
+        i = self._index[key]
+        return self._view[self._offsets[i]:self._offsets[i + 1]]
+
+    def get(self, key, default=None):
+        return self[key] if key in self._index else default
+
+    def count(self, key):
+        i = self._index.get(key)
+        return 0 if i is None else self._offsets[i + 1] - self._offsets[i]
+
+    def items(self):
+        for key in self._index:
+            yield key, self[key]
+
+    def pairs(self):
+        for key, values in self.items():
+            yield from zip(repeat(key), values)
+
+    # the key number of every value, in the order of the values array
+    def _codes(self):
+        offsets = self._offsets
+        codes = array('I')
+        if np is not None:
+            counts = np.diff(np.frombuffer(offsets, dtype=offsets.typecode))
+            codes.frombytes(np.repeat(np.arange(len(counts), dtype=np.uint32), counts).tobytes())
+        else:
+            codes.extend(chain.from_iterable(map(repeat, range(len(self._index)),
+                                                 map(int.__sub__, offsets[1:], offsets[:-1]))))
+        return codes
+
+    # a new FrozenMultiDict with the pairs added after the existing values. The existing arrays are copied and
+    # regrouped as a whole, nothing is done per existing value in Python; the key dict is only copied when
+    # there are new keys, so this one stays valid
+    def merged(self, pairs, unique=False):
+        index = self._index
+        codes = self._codes()
+        values = array(self.typecode, self._values)
+        for key, value in pairs:
+            code = index.get(key)
+            if code is None:
+                if index is self._index:
+                    index = dict(index)
+                code = index[key] = len(index)
+            codes.append(code)
+            values.append(value)
+        offsets, grouped = _group(codes, values, len(index), unique)
+        return FrozenMultiDict(index, offsets, grouped)
+
+    @property
+    def typecode(self):
+        return self._values.typecode
+
+    def nbytes(self):
+        return self._offsets.itemsize * len(self._offsets) + self._values.itemsize * len(self._values)
+
+
+# Mutable front end for a FrozenMultiDict. New values go into a small defaultdict(list) and are merged into
+# the frozen arrays in one rebuild once `merge_every` of them have piled up, instead of growing per-key lists.
+class StagingMultiDict:
+    def __init__(self, frozen=None, typecode='q', unique=False, merge_every=100000):
+        self.frozen = frozen if frozen is not None else FrozenMultiDict.from_pairs((), typecode, unique)
+        self._typecode = frozen.typecode if frozen is not None else typecode
+        self._unique = unique
+        self._merge_every = merge_every
+        self._pending = defaultdict(list)
+        self._pending_count = 0
+
+    def add(self, key, value):
+        self._pending[key].append(value)
+        self._pending_count += 1
+        if self._pending_count >= self._merge_every:
+            self.merge()
+
+    def merge(self):
+        if self._pending_count:
+            pending = ((key, v) for key, values in self._pending.items() for v in values)
+            self.frozen = self.frozen.merged(pending, self._unique)
+            self._pending = defaultdict(list)
+            self._pending_count = 0
+        return self.frozen
+
+    # a memoryview like FrozenMultiDict gives, also for keys with values that are not merged yet
+    def __getitem__(self, key):
+        pending = self._pending.get(key)
+        if not pending:
+            return self.frozen[key]
+        merged = array(self._typecode, self.frozen.get(key, ()))
+        merged.extend(pending)
+        if self._unique:
+            merged = array(self._typecode, sorted(set(merged)))
+        return memoryview(merged)
+
+    def __contains__(self, key):
+        return key in self.frozen or key in self._pending
+
+
+def benchmark(keys=200000, values_per_key=3):
+    rand = random.Random(0)
+    pairs = [(rand.randrange(keys), rand.randrange(1000)) for _ in range(keys * values_per_key)]
+
+    tracemalloc.start()
+    d = defaultdict(list)
+    for k, v in pairs:
+        d[k].append(v)
+    lists_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del d
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    frozen = FrozenMultiDict.from_pairs(pairs)
+    build = time.perf_counter() - start
+    frozen_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{:,} pairs: defaultdict(list) {:.1f} MB, FrozenMultiDict {:.1f} MB (built in {:.2f}s)'.format(
+        len(pairs), lists_size / 1e6, frozen_size / 1e6, build))
+
+
+if __name__ == '__main__':
+    d = FrozenMultiDict.from_pairs([('a', 1), ('b', 3), ('a', 2), ('a', 1), ('b', 4)])
+    print("a => ", d['a'].tolist())
+    s = FrozenMultiDict.from_pairs([('a', 1), ('b', 3), ('a', 2), ('a', 1), ('b', 4)], unique=True)
+    print("a as a set => ", s['a'].tolist())
+
+    staging = StagingMultiDict(d, merge_every=2)
+    staging.add('c', 5)
+    print("c before merging => ", staging['c'].tolist())
+    staging.add('a', 7)
+    print("a after merging => ", staging['a'].tolist())
+
+    benchmark()
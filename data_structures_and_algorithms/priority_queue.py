@@ -1,16 +1,98 @@
 # implements a simple priority queue using heapq based on highest priority
 import heapq
+import random
+import time
+
+
+# push() hands back one of these. It remembers where its item sits in the heap, so the item can be
+# reprioritized or removed without searching the heap for it
+class _Entry:
+    __slots__ = ('key', 'item', 'pos')
+
+    def __init__(self, key, item, pos):
+        self.key = key
+        self.item = item
+        self.pos = pos
+
 
 class PriorityQueue:
     def __init__(self):
         self._queue = []
         self._index = 0
+    def __len__(self):
+        return len(self._queue)
     def push(self, item, priority):
-        heapq.heappush(self._queue, (-priority, self._index, item))
-        self._index = 1
+        # the index breaks ties so items with the same priority come out in the order they were pushed
+        entry = _Entry((-priority, self._index), item, len(self._queue))
+        self._index += 1
+        self._queue.append(entry)
+        self._sift_up(entry.pos)
+        return entry
     def pop(self):
-        # -1 gets the last item in the tuple
-        return heapq.heappop(self._queue)[-1]
+        if not self._queue:
+            raise IndexError('pop from empty priority queue')
+        return self.remove(self._queue[0])
+    def peek(self):
+        if not self._queue:
+            raise IndexError('peek at empty priority queue')
+        return self._queue[0].item
+    def update_priority(self, handle, priority):
+        if handle.pos is None:
+            raise ValueError('item is no longer in the queue')
+        old = handle.key
+        handle.key = (-priority, old[1])
+        if handle.key < old:
+            self._sift_up(handle.pos)
+        else:
+            self._sift_down(handle.pos)
+    def remove(self, handle):
+        pos = handle.pos
+        if pos is None:
+            raise ValueError('item is no longer in the queue')
+        last = self._queue.pop()
+        if last is not handle:
+            # move the last entry into the hole and let it find its place
+            self._queue[pos] = last
+            last.pos = pos
+            self._sift_up(pos)
+            self._sift_down(last.pos)
+        handle.pos = None
+        return handle.item
+
+    def _sift_up(self, pos):
+        heap = self._queue
+        entry = heap[pos]
+        while pos > 0:
+            parent_pos = (pos - 1) >> 1
+            parent = heap[parent_pos]
+            if not entry.key < parent.key:
+                break
+            heap[pos] = parent
+            parent.pos = pos
+            pos = parent_pos
+        heap[pos] = entry
+        entry.pos = pos
+
+    def _sift_down(self, pos):
+        heap = self._queue
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            child_pos = 2 * pos + 1
+            if child_pos >= size:
+                break
+            # pick the smaller of the two children
+            right_pos = child_pos + 1
+            if right_pos < size and heap[right_pos].key < heap[child_pos].key:
+                child_pos = right_pos
+            child = heap[child_pos]
+            if not child.key < entry.key:
+                break
+            heap[pos] = child
+            child.pos = pos
+            pos = child_pos
+        heap[pos] = entry
+        entry.pos = pos
 
 class Item:
     def __init__(self, name):
@@ -21,13 +103,49 @@ class Item:
 def run():
     q = PriorityQueue()
     q.push(Item('foo'), 1)
-    q.push(Item('bar'), 5)
+    bar = q.push(Item('bar'), 5)
     q.push(Item('spam'), 4)
-    q.push(Item('grok'), 1)
-    print(q.pop())
+    grok = q.push(Item('grok'), 1)
+    q.update_priority(grok, 10)
+    q.remove(bar)
+    print(q.peek())
     print(q.pop())
     print(q.pop())
     print(q.pop())
 
 
-run()
\ No newline at end of file
+# churn: half of the operations re-rank a queued job, a quarter cancel one and a quarter queue a new one
+def benchmark(n=1000000, ops=1000000):
+    rand = random.Random(0)
+    q = PriorityQueue()
+    handles = [q.push(i, rand.random()) for i in range(n)]
+    start = time.perf_counter()
+    for i in range(ops):
+        r = rand.random()
+        if r < 0.5:
+            q.update_priority(handles[rand.randrange(len(handles))], rand.random())
+        elif r < 0.75:
+            j = rand.randrange(len(handles))
+            handles[j], handles[-1] = handles[-1], handles[j]
+            q.remove(handles.pop())
+        else:
+            handles.append(q.push(n + i, rand.random()))
+    elapsed = time.perf_counter() - start
+    print('indexed heap: {:,} ops on {:,} items in {:.2f}s ({:,.0f} ops/sec)'.format(ops, n, elapsed, ops / elapsed))
+
+    # the old way: change the list in place and heapify() it again, O(n) per change
+    heap = [(-rand.random(), i, i) for i in range(n)]
+    heapq.heapify(heap)
+    rebuilds = 20
+    start = time.perf_counter()
+    for _ in range(rebuilds):
+        j = rand.randrange(len(heap))
+        heap[j] = (-rand.random(),) + heap[j][1:]
+        heapq.heapify(heap)
+    elapsed = time.perf_counter() - start
+    print('heapify rebuild: {:,.0f} ops/sec'.format(rebuilds / elapsed))
+
+
+if __name__ == '__main__':
+    run()
+    benchmark()
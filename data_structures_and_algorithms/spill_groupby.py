@@ -0,0 +1,212 @@
+import heapq
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby as sorted_groupby
+from operator import itemgetter
+
+
+# keys that are equal have the same hash (1, 1.0 and True; Decimal('1') and Decimal('1.0')), so they always end
+# up in the same partition. Spilling and splitting both happen in this process, so the hash seed does not
+# matter. A small int is its own hash, with nothing in the higher bits that splits use; hashing it in a tuple
+# mixes those bits without changing which keys hash the same
+_HASH_BITS = sys.hash_info.width
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+
+def _hash(key):
+    return hash((key,)) & _HASH_MASK
+
+
+def _read_records(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+# runs in a worker process: gather one partition's groups, aggregate them, and write them out sorted by key.
+# The whole partition is held in memory here, which is why partitions are split until they fit
+def _sort_partition(path, agg):
+    groups = defaultdict(list)
+    for key, rows in _read_records(path):
+        groups[key].extend(rows)
+    os.remove(path)
+    run_path = path + '.sorted'
+    with open(run_path, 'wb') as f:
+        for key in sorted(groups):
+            rows = groups.pop(key)
+            pickle.dump((key, agg(rows) if agg else rows), f, pickle.HIGHEST_PROTOCOL)
+    return run_path
+
+
+# groupby for data bigger than memory. Rows are collected in a defaultdict(list) multidict like the one in
+# groupingRecordsTogether.py, but once more than `memory_budget` rows are held they are hash-partitioned into
+# `partitions` spill files. At the end every partition is grouped and sorted in its own process, and the sorted
+# partitions are merged so (key, group) pairs come out in key order with only one group per partition in memory.
+#
+# A worker holds a whole partition, and `workers` of them run at once, so every partition has to stay under
+# memory_budget / workers rows. Any partition that is bigger is split again, into as many pieces as its row count
+# needs, using further bits of the same hash; a piece that is still too big is split again. Only a single key
+# with more rows than that can not be split, and its group is loaded whole.
+# agg, if given, is applied to each group (it must be picklable, e.g. a module-level function).
+class SpillGroupBy:
+    def __init__(self, key, memory_budget=1000000, partitions=16, agg=None, workers=None, tmpdir=None):
+        self._key = itemgetter(key) if isinstance(key, str) else key
+        self._budget = memory_budget
+        self._partitions = partitions
+        self._agg = agg
+        self._workers = workers or os.cpu_count() or 1
+        self._tmpdir = tmpdir
+        self._dir = None
+        self._buffer = defaultdict(list)
+        self._buffered = 0
+        self._counts = [0] * partitions
+        self._names = 0
+        self.spills = 0
+        self.resplits = 0
+
+    def _partition_path(self, i):
+        return os.path.join(self._dir, 'part%03d' % i)
+
+    def _new_path(self):
+        self._names += 1
+        return os.path.join(self._dir, 'split%06d' % self._names)
+
+    def _spill(self):
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix='groupby', dir=self._tmpdir)
+        files = {}
+        try:
+            for key, rows in self._buffer.items():
+                i = _hash(key) % self._partitions
+                f = files.get(i)
+                if f is None:
+                    f = files[i] = open(self._partition_path(i), 'ab')
+                pickle.dump((key, rows), f, pickle.HIGHEST_PROTOCOL)
+                self._counts[i] += len(rows)
+        finally:
+            for f in files.values():
+                f.close()
+        self._buffer = defaultdict(list)
+        self._buffered = 0
+        self.spills += 1
+
+    # split one partition file n ways on hash // divisor, streaming it, and return [(path, rows), ...]
+    def _split(self, path, n, divisor):
+        paths = [self._new_path() for _ in range(n)]
+        counts = [0] * n
+        files = {}
+        try:
+            for key, rows in _read_records(path):
+                i = _hash(key) // divisor % n
+                f = files.get(i)
+                if f is None:
+                    f = files[i] = open(paths[i], 'ab')
+                pickle.dump((key, rows), f, pickle.HIGHEST_PROTOCOL)
+                counts[i] += len(rows)
+        finally:
+            for f in files.values():
+                f.close()
+        os.remove(path)
+        self.resplits += 1
+        return [(p, c) for p, c in zip(paths, counts) if c]
+
+    # the partition files, each split until it is at most `limit` rows
+    def _fitted_partitions(self, limit):
+        todo = [(self._partition_path(i), c, self._partitions) for i, c in enumerate(self._counts) if c]
+        ready = []
+        while todo:
+            path, count, divisor = todo.pop()
+            # past the width of the hash there is nothing left to split on: one key, or keys that collide
+            if count <= limit or divisor >> _HASH_BITS:
+                ready.append(path)
+                continue
+            n = -(-count // limit)
+            todo.extend((p, c, divisor * n) for p, c in self._split(path, n, divisor))
+        return ready
+
+    def add(self, rows):
+        key = self._key
+        for row in rows:
+            self._buffer[key(row)].append(row)
+            self._buffered += 1
+            if self._buffered >= self._budget:
+                self._spill()
+
+    def groups(self):
+        try:
+            if self._dir is None:
+                # everything fit in memory
+                for k in sorted(self._buffer):
+                    rows = self._buffer[k]
+                    yield k, self._agg(rows) if self._agg else rows
+                return
+            if self._buffer:
+                self._spill()
+            paths = self._fitted_partitions(max(1, self._budget // self._workers))
+            # at most `workers` partitions are loaded at the same time, and each one fits its share of the budget
+            with ProcessPoolExecutor(max_workers=self._workers) as pool:
+                runs = list(pool.map(_sort_partition, paths, [self._agg] * len(paths)))
+            yield from heapq.merge(*(_read_records(r) for r in runs), key=itemgetter(0))
+        finally:
+            self.close()
+
+    def close(self):
+        self._buffer = defaultdict(list)
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
+def groupby(rows, key, **kwargs):
+    g = SpillGroupBy(key, **kwargs)
+    g.add(rows)
+    return g.groups()
+
+
+def benchmark(rows=1000000, budget=100000):
+    rand = random.Random(0)
+    data = [{'address': '%d N CLARK' % rand.randrange(100000),
+             'date': '07/%02d/2012' % rand.randrange(1, 31)} for _ in range(rows)]
+
+    start = time.perf_counter()
+    data.sort(key=itemgetter('date'))
+    expected = [(date, sum(1 for _ in items)) for date, items in sorted_groupby(data, key=itemgetter('date'))]
+    print('sort + itertools.groupby: {:.2f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    g = SpillGroupBy('date', memory_budget=budget, agg=len)
+    g.add(data)
+    result = list(g.groups())
+    print('SpillGroupBy ({} spills, {} partitions split again): {:.2f}s'.format(
+        g.spills, g.resplits, time.perf_counter() - start))
+    assert result == expected
+
+
+if __name__ == '__main__':
+    rows = [
+        {'address': '5412 N CLARK', 'date': '07/01/2012'},
+        {'address': '5148 N CLARK', 'date': '07/04/2012'},
+        {'address': '5800 E 58TH', 'date': '07/02/2012'},
+        {'address': '2122 N CLARK', 'date': '07/03/2012'},
+        {'address': '5645 N RAVENSWOOD', 'date': '07/02/2012'},
+        {'address': '1060 W ADDISON', 'date': '07/02/2012'},
+        {'address': '4801 N BROADWAY', 'date': '07/01/2012'},
+        {'address': '1039 W GRANVILLE', 'date': '07/04/2012'},
+    ]
+    # a tiny budget to force the rows out to disk
+    for date, items in groupby(rows, 'date', memory_budget=3, partitions=4):
+        print(date)
+        for i in items:
+            print('     ', i)
+
+    benchmark()
@@ -0,0 +1,129 @@
+import random
+import time
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
+
+
+# Routes (tag, *args) records like the ones in python_notes1.py without an if tag == 'foo' / elif chain.
+# Handlers are registered per tag. A batch handler gets a whole list of argument tuples at once, so the
+# cost of the call is paid once per batch instead of once per record; a plain per-record handler still
+# works and is used when no batch handler is registered for a tag.
+class Dispatcher:
+    def __init__(self, batch_size=10000):
+        self.batch_size = batch_size
+        self._handlers = {}
+        self._batch_handlers = {}
+        self._default = None
+
+    def register(self, tag, handler=None):
+        # usable as dispatcher.register('foo', do_foo) or as a @dispatcher.register('foo') decorator
+        if handler is None:
+            return lambda f: self.register(tag, f)
+        self._handlers[tag] = handler
+        return handler
+
+    def register_batch(self, tag, handler=None):
+        if handler is None:
+            return lambda f: self.register_batch(tag, f)
+        self._batch_handlers[tag] = handler
+        return handler
+
+    def default(self, handler):
+        # called with the whole record for tags nobody registered
+        self._default = handler
+        return handler
+
+    def _flush(self, tag, batch):
+        handler = self._batch_handlers.get(tag)
+        if handler is not None:
+            handler(batch)
+            return
+        handler = self._handlers.get(tag)
+        if handler is not None:
+            for args in batch:
+                handler(*args)
+        elif self._default is not None:
+            for args in batch:
+                self._default((tag,) + args)
+        else:
+            raise KeyError('no handler for tag {!r}'.format(tag))
+
+    # group the records by tag, batch_size records at a time, and hand every group to its handler.
+    # Records with the same tag are handled in order; records with different tags may be reordered
+    # within a batch
+    def dispatch(self, records):
+        it = iter(records)
+        while True:
+            chunk = list(islice(it, self.batch_size))
+            if not chunk:
+                break
+            # tags only need to be hashable, like with a dict of handlers; appending keeps each tag in order
+            groups = defaultdict(list)
+            for record in chunk:
+                groups[record[0]].append(record[1:])
+            for tag, batch in groups.items():
+                self._flush(tag, batch)
+
+    # one record at a time, for when the order between different tags matters
+    def dispatch_one(self, record):
+        tag = record[0]
+        handler = self._handlers.get(tag)
+        if handler is not None:
+            handler(*record[1:])
+        elif tag in self._batch_handlers:
+            self._batch_handlers[tag]([record[1:]])
+        elif self._default is not None:
+            self._default(record)
+        else:
+            raise KeyError('no handler for tag {!r}'.format(tag))
+
+
+def benchmark(n=2000000, tags=200):
+    rand = random.Random(0)
+    names = ['tag%d' % i for i in range(tags)]
+    records = [(rand.choice(names), i, i) for i in range(n)]
+    totals = defaultdict(int)
+
+    def make_handler(tag):
+        def handler(x, y):
+            totals[tag] += x
+        return handler
+
+    def make_batch_handler(tag):
+        def handler(batch):
+            totals[tag] += sum(map(itemgetter(0), batch))
+        return handler
+
+    handlers = {tag: make_handler(tag) for tag in names}
+    start = time.perf_counter()
+    for tag, *args in records:
+        handlers[tag](*args)
+    print('per record, dict of handlers: {:.2f}s'.format(time.perf_counter() - start))
+    expected = dict(totals)
+    totals.clear()
+
+    d = Dispatcher()
+    for tag in names:
+        d.register_batch(tag, make_batch_handler(tag))
+    start = time.perf_counter()
+    d.dispatch(records)
+    print('Dispatcher batches:           {:.2f}s'.format(time.perf_counter() - start))
+    assert dict(totals) == expected
+
+
+if __name__ == '__main__':
+    records = [('foo', 1, 2), ('bar', 'hello'), ('foo', 3, 4)]
+
+    d = Dispatcher()
+
+    @d.register('foo')
+    def do_foo(x, y):
+        print('foo', x, y)
+
+    @d.register_batch('bar')
+    def do_bar_many(list_of_args):
+        print('bar', [s for s, in list_of_args])
+
+    d.dispatch(records)
+    benchmark()
@@ -0,0 +1,164 @@
+import heapq
+import random
+import time
+from array import array
+from itertools import count
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# python_notes3.py uses heapq.nlargest(3, portfolio, key=lambda s: s['price']), which calls a Python lambda
+# for every row. Passing the field names instead lets us use itemgetter, which does the lookup in C.
+def _key(key):
+    if key is None or callable(key):
+        return key
+    if isinstance(key, str):
+        return itemgetter(key)
+    return itemgetter(*key)
+
+
+# Streaming top-k: keeps at most k rows (plus any rows tied with the k-th one when ties=True) so it runs
+# over an iterator in constant memory. key can be a field name, a list of field names or a function.
+# Rows with equal keys come out in the order they were seen, like heapq.nlargest.
+def top_k(k, rows, key=None, largest=True, ties=False):
+    key = _key(key)
+    if not ties:
+        return (heapq.nlargest if largest else heapq.nsmallest)(k, rows, key=key)
+    if k <= 0:
+        return []
+    key = key or (lambda row: row)
+    sign = 1 if largest else -1
+    # min-heap of the k best so far, worst on top; the index makes the ordering stable
+    heap = []
+    tied = []
+    n = count()
+    for row in rows:
+        value = key(row)
+        # cheap early exit for the common case of a row that is clearly out
+        if len(heap) == k and (value < heap[0][0].value if largest else heap[0][0].value < value):
+            continue
+        entry = (_Ranked(value, sign), -next(n), row)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[0] == heap[0][0]:
+            tied.append(entry)
+        elif heap[0][0] < entry[0]:
+            worst = heapq.heapreplace(heap, entry)
+            # the old worst is still tied with the new worst, keep it; otherwise every tie is out
+            if worst[0] == heap[0][0]:
+                tied.append(worst)
+            else:
+                tied = [t for t in tied if t[0] == heap[0][0]]
+    result = sorted(heap + tied, reverse=True)
+    return [row for _, _, row in result]
+
+
+# Compares keys in the right direction so one heap works for both nlargest and nsmallest
+class _Ranked:
+    __slots__ = ('value', 'sign')
+
+    def __init__(self, value, sign):
+        self.value = value
+        self.sign = sign
+
+    def __lt__(self, other):
+        return self.value < other.value if self.sign > 0 else other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def nsmallest(k, rows, key=None, ties=False):
+    return top_k(k, rows, key, largest=False, ties=ties)
+
+
+# Top-k over numeric columns: returns the row indices of the k largest (or smallest) values of `columns[0]`,
+# with the other columns breaking ties. With NumPy it uses argpartition, so only the candidates get sorted;
+# otherwise it falls back to a heap over the column (an array.array or a list).
+def top_k_indices(k, *columns, largest=True, ties=False):
+    primary = columns[0]
+    n = len(primary)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    if np is not None:
+        # the columns are never negated for largest=True, which would wrap around for unsigned and fail for bool
+        cols = [np.asarray(c) for c in columns]
+        values = cols[0]
+        if k < n:
+            if largest:
+                candidates = np.argpartition(values, n - k)[n - k:]
+                cutoff = values[candidates].min()
+                beyond = values[candidates] > cutoff
+            else:
+                candidates = np.argpartition(values, k - 1)[:k]
+                cutoff = values[candidates].max()
+                beyond = values[candidates] < cutoff
+            # argpartition picks an arbitrary subset of the values tied with the cutoff, so take them all
+            candidates = np.concatenate([candidates[beyond], np.flatnonzero(values == cutoff)])
+        else:
+            candidates = np.arange(n)
+        # lexsort sorts by the last key first, ascending; the index keeps equal rows in their original order.
+        # For largest the order is reversed afterwards, so the index goes in descending
+        keys = [c[candidates] for c in reversed(cols)]
+        if largest:
+            ranked = candidates[np.lexsort([-candidates] + keys)[::-1]]
+        else:
+            ranked = candidates[np.lexsort([candidates] + keys)]
+        if not ties:
+            return ranked[:k].tolist()
+        kth = tuple(c[ranked[k - 1]] for c in cols)
+        end = k
+        while end < len(ranked) and tuple(c[ranked[end]] for c in cols) == kth:
+            end += 1
+        return ranked[:end].tolist()
+    if len(columns) == 1:
+        key = primary.__getitem__
+    else:
+        key = lambda i: tuple(c[i] for c in columns)
+    return top_k(k, range(n), key=key, largest=largest, ties=ties)
+
+
+def benchmark(rows=1000000, k=3):
+    rand = random.Random(0)
+    portfolio = [{'name': 'S%d' % i, 'shares': rand.randrange(1000), 'price': round(rand.uniform(1, 1000), 2)}
+                 for i in range(rows)]
+    prices = array('d', (s['price'] for s in portfolio))
+
+    start = time.perf_counter()
+    a = heapq.nlargest(k, portfolio, key=lambda s: s['price'])
+    print('heapq.nlargest with lambda:  {:.3f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    b = top_k(k, portfolio, key='price')
+    print('top_k with itemgetter:       {:.3f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    c = [portfolio[i] for i in top_k_indices(k, prices)]
+    print('top_k_indices on array:      {:.3f}s ({})'.format(time.perf_counter() - start,
+                                                              'numpy' if np is not None else 'heap'))
+
+    start = time.perf_counter()
+    d = top_k(k, iter(portfolio), key='price', ties=True)
+    print('top_k streaming with ties:   {:.3f}s'.format(time.perf_counter() - start))
+    assert a == b == c == d[:k]
+
+
+if __name__ == '__main__':
+    portfolio = [
+        {'name': 'IBM', 'shares': 100, 'price': 91.1},
+        {'name': 'AAPL', 'shares': 50, 'price': 543.22},
+        {'name': 'FB', 'shares': 200, 'price': 21.09},
+        {'name': 'HPQ', 'shares': 35, 'price': 31.75},
+        {'name': 'YHOO', 'shares': 45, 'price': 16.35},
+        {'name': 'ACME', 'shares': 75, 'price': 91.1}
+    ]
+    print(top_k(2, portfolio, key='price', ties=True))
+    print(nsmallest(2, portfolio, key=['shares', 'price']))
+    print(top_k_indices(2, [s['price'] for s in portfolio], [s['shares'] for s in portfolio]))
+
+    benchmark()
@@ -1,5 +1,7 @@
 import re
 
+from highlighter import Highlighter
+
 # colors
 print('\u001b[31mHello World')
 
@@ -21,11 +23,10 @@ def highlight_text(t, w):
     return re.sub(r'\b({w})\b'.format(w=w), u'\u001b[31m'r'\1'u'\u001b[0m', t, flags=re.IGNORECASE)
 
 
+# one pass for all the words instead of a re.sub per word, which copied the text for every word and could match
+# inside the escape codes added for the words before it. The words are plain text now, not regular expressions
 def highlight_text_multiple(t, words):
-    h_text = t
-    for w in words:
-        h_text = re.sub(r'({0})'.format(w), u'\u001b[31m'r'\1'u'\u001b[0m', h_text, flags=re.IGNORECASE)
-    return h_text
+    return Highlighter(words).highlight(t)
 
 
 highlighted_text = highlight_text_multiple(text, ['work', 'jeff'])
@@ -10,6 +10,8 @@ with open('test.txt', 'rt') as f:
     for line in f:
         lines.append(line)
 print(lines)
+# for a big file, line_index.LineFile gets at any line (lines[i], slices, reversed) without the list, by mapping
+# the file into memory and keeping only the offset of every line
 
 # write chunks of text data
 with open('test.txt', 'wt') as f:
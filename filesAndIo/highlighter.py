@@ -0,0 +1,192 @@
+import argparse
+import random
+import re
+import sys
+import time
+
+RESET = u'\u001b[0m'
+COLORS = {'black': 30, 'red': 31, 'green': 32, 'yellow': 33, 'blue': 34, 'magenta': 35, 'cyan': 36, 'white': 37}
+
+# escape codes that are already in the text are matched first and copied as they are, so a term is never
+# found inside one
+_ESCAPE = r'\x1b\[[0-9;?]*[A-Za-z]'
+
+
+def _color(c):
+    if isinstance(c, int):
+        return u'\u001b[38;5;{}m'.format(c)
+    if c in COLORS:
+        return u'\u001b[{}m'.format(COLORS[c])
+    return c
+
+
+# One regular expression for all the terms, with common prefixes shared: ['work', 'worker', 'word'] becomes
+# wor(?:d|k(?:er)?). A plain 'work|worker|word' alternation makes re try every term at every position, which
+# is hopeless with thousands of terms; with the prefixes shared it only follows the branch that matches. The
+# optional parts are greedy, so the longest term wins where terms overlap. Works for str and for bytes terms
+# (data_structures_and_algorithms/multi_search.py uses it for bytes)
+def trie_pattern(words):
+    trie = {}
+    empty = None
+    for w in words:
+        empty = w[:0]
+        node = trie
+        for i in range(len(w)):
+            node = node.setdefault(w[i:i + 1], {})
+        node[None] = True
+    if empty is None:
+        return ''
+    group, bar, close, optional = ('(?:', '|', ')', ')?') if isinstance(empty, str) else (b'(?:', b'|', b')', b')?')
+
+    def build(node):
+        branches = [re.escape(ch) + build(node[ch]) for ch in sorted(ch for ch in node if ch is not None)]
+        if not branches:
+            return empty
+        body = branches[0] if len(branches) == 1 else group + bar.join(branches) + close
+        if None in node:
+            return group + body + optional
+        return body
+
+    return build(trie)
+
+
+# highlight_text_multiple() in escape_codes_examples.py runs re.sub once per word: every word copies the whole
+# text again, and later words can match inside the escape codes added for earlier ones. This does all the
+# words in one pass, with a color per term if wanted
+class Highlighter:
+    def __init__(self, terms, color='red', ignore_case=True, whole_words=False):
+        # terms is a list of words (all in `color`) or a dict of word -> color. A color is a name from COLORS,
+        # a number from the 256 color palette or an escape code
+        if not isinstance(terms, dict):
+            terms = dict.fromkeys(terms, color)
+        self.ignore_case = ignore_case
+        self._colors = {}
+        for term, c in terms.items():
+            if term:
+                self._colors.setdefault(term.lower() if ignore_case else term, _color(c))
+        if not self._colors:
+            raise ValueError('no terms to highlight')
+        words = trie_pattern(self._colors)
+        if whole_words:
+            words = r'\b' + words + r'\b'
+        # re is a lot slower with IGNORECASE, so the terms are looked for case sensitively in text.lower() and
+        # the matches are copied from the original text. The escape code branch is only used when the text has
+        # escape codes in it
+        self._words = re.compile(words)
+        self._escapes = re.compile('({})|{}'.format(_ESCAPE, words))
+        # for the rare text where lower() changes the length, and the positions would not line up
+        self._ignore_case = re.compile('({})|{}'.format(_ESCAPE, words), re.IGNORECASE)
+
+    def _replace(self, m):
+        if m.group(1):
+            return m.group()
+        return self._colors[m.group().lower()] + m.group() + RESET
+
+    def highlight(self, text):
+        search = text
+        if self.ignore_case:
+            search = text.lower()
+            if len(search) != len(text):
+                return self._ignore_case.sub(self._replace, text)
+        pattern = self._escapes if '\x1b' in text else self._words
+        colors = self._colors
+        out = []
+        last = 0
+        for m in pattern.finditer(search):
+            if m.lastindex:
+                continue
+            start, end = m.span()
+            out += (text[last:start], colors[m.group()], text[start:end], RESET)
+            last = end
+        out.append(text[last:])
+        return ''.join(out)
+
+    # highlight a stream of lines, a block of whole lines at a time. A term never spans lines, so the blocks
+    # can be done separately and one pass covers thousands of lines
+    def highlight_lines(self, lines, block=4096):
+        buf = []
+        for line in lines:
+            buf.append(line)
+            if len(buf) == block:
+                yield self.highlight(''.join(buf))
+                buf = []
+        if buf:
+            yield self.highlight(''.join(buf))
+
+    def highlight_stream(self, fin, fout, chunk_size=1 << 20):
+        rest = ''
+        while True:
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                break
+            chunk = rest + chunk
+            cut = chunk.rfind('\n') + 1
+            rest = chunk[cut:]
+            if cut:
+                fout.write(self.highlight(chunk[:cut]))
+        if rest:
+            fout.write(self.highlight(rest))
+
+
+def benchmark(terms=2000, lines=20000):
+    rand = random.Random(0)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = [''.join(rand.choice(letters) for _ in range(rand.randint(4, 10))) for _ in range(terms)]
+    vocabulary = words[:200] + [''.join(rand.choice(letters) for _ in range(6)) for _ in range(5000)]
+    text = '\n'.join(' '.join(rand.choice(vocabulary) for _ in range(12)) for _ in range(lines)) + '\n'
+
+    def report(name, work, sample=text):
+        start = time.perf_counter()
+        work(sample)
+        elapsed = time.perf_counter() - start
+        print('{:<40} {:6.2f}s {:6.2f} MB/s'.format(name, elapsed, len(sample) / 1e6 / elapsed))
+
+    # the old way: a full pass over the text per term, so only 50 of them
+    def n_pass(t):
+        for w in words[:50]:
+            t = re.sub(r'({0})'.format(w), u'\u001b[31m'r'\1'u'\u001b[0m', t, flags=re.IGNORECASE)
+
+    report('re.sub per term, 50 terms', n_pass)
+    # one alternation of all the terms with nothing shared is too slow to run over all of the text
+    plain = re.compile('|'.join(map(re.escape, sorted(words, key=len, reverse=True))), re.IGNORECASE)
+    report('one plain alternation, {} terms'.format(terms), lambda t: plain.sub(u'\u001b[31m'r'\g<0>'u'\u001b[0m', t),
+           text[:len(text) // 20])
+    palette = {w: 196 + i % 36 for i, w in enumerate(words)}
+    report('Highlighter, {} terms'.format(terms), Highlighter(palette).highlight)
+    report('Highlighter, {} terms, whole words'.format(terms), Highlighter(palette, whole_words=True).highlight)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='highlight words in files or stdin')
+    parser.add_argument('-w', '--word', action='append', default=[], help='a word to highlight, word or word=color')
+    parser.add_argument('-t', '--terms', help='a file with one word (or word<TAB>color) per line')
+    parser.add_argument('--case', action='store_true', help='case sensitive')
+    parser.add_argument('--words', action='store_true', help='only match whole words')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('files', nargs='*')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        sys.exit()
+
+    terms = {}
+    specs = args.word
+    if args.terms:
+        with open(args.terms) as f:
+            specs = specs + [line.rstrip('\n').replace('\t', '=', 1) for line in f if line.strip()]
+    for spec in specs:
+        word, _, c = spec.partition('=')
+        terms[word] = int(c) if c.isdigit() else (c or 'red')
+    if not terms:
+        text = 'Hello my name is Jeff. Today I went to work. Work is very hard. Work is tiring. Work is interesting.'
+        print(Highlighter(['work', 'jeff']).highlight(text))
+        print(Highlighter({'work': 'red', 'jeff': 'cyan', 'hard': 208}, whole_words=True).highlight(text))
+        sys.exit()
+
+    h = Highlighter(terms, ignore_case=not args.case, whole_words=args.words)
+    if not args.files:
+        h.highlight_stream(sys.stdin, sys.stdout)
+    for path in args.files:
+        with open(path, errors='replace') as f:
+            h.highlight_stream(f, sys.stdout)
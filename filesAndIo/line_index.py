@@ -0,0 +1,250 @@
+import mmap
+import os
+import random
+import re
+import struct
+import tempfile
+import time
+import zlib
+from array import array
+from itertools import chain
+from operator import methodcaller
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_NEWLINE = re.compile(b'\n')
+_end = re.Match.end
+
+# sidecar header: magic, typecode, file size, file mtime, number of newlines, crc32 of the bytes before the
+# file size it was built for
+_HEADER = struct.Struct('<4s2sqqqI')
+_MAGIC = b'LIDX'
+_CHECK = 4096
+
+
+# file_example1.py reads every line of a file into a list to get at them. LineFile maps the file into memory
+# instead and keeps one number per line: the offset just past each '\n'. Line i runs from ends[i - 1] to
+# ends[i], so lines[i], slices and reverse iteration only touch the lines asked for. The offsets are 4 bytes
+# each while the file is under 4GB and 8 bytes after that.
+#
+# The index is saved next to the file (path + '.lidx') together with the size and mtime the file had. When
+# the file is opened again with the same size and mtime the index is just loaded. When the file has only
+# grown (a log that is appended to) and its old last 4KB are unchanged, only the new part is scanned
+class LineFile:
+    def __init__(self, path, index_path=None, encoding='utf-8', errors='replace', chunk_size=1 << 26, save=True):
+        self.path = path
+        self.index_path = index_path if index_path is not None else path + '.lidx'
+        self.encoding = encoding
+        self.errors = errors
+        self.chunk_size = chunk_size
+        self.save_index = save
+        self._file = open(path, 'rb')
+        self._mm = None
+        self._size = 0
+        self._mtime = 0
+        self._crc = 0
+        self._ends = array('I')
+        self.scanned = 0
+        if not self._load():
+            self._ends = array('I')
+            self._size = 0
+        self.refresh()
+
+    # (re)map the file when its size changed; an empty file cannot be mapped and is just b''
+    def _map(self):
+        st = os.fstat(self._file.fileno())
+        if self._mm is None or len(self._mm) != st.st_size:
+            self._unmap()
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b''
+        return st
+
+    def _unmap(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def _tail_crc(self, size):
+        return zlib.crc32(self._mm[max(0, size - _CHECK):size])
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                header = f.read(_HEADER.size)
+                magic, typecode, size, mtime, count, crc = _HEADER.unpack(header)
+                if magic != _MAGIC:
+                    return False
+                ends = array(typecode.decode().strip())
+                ends.fromfile(f, count)
+        except (OSError, struct.error, EOFError, ValueError):
+            return False
+        st = self._map()
+        if st.st_size < size or self._tail_crc(size) != crc:
+            return False
+        if st.st_size == size and st.st_mtime_ns != mtime:
+            # same size but rewritten since; the crc only covers the end of it
+            return False
+        self._ends = ends
+        self._size = size
+        self._mtime = mtime
+        self._crc = crc
+        return True
+
+    def save(self):
+        tmp = self.index_path + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, self._ends.typecode.encode().ljust(2), self._size, self._mtime,
+                                     len(self._ends), self._crc))
+                self._ends.tofile(f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass
+
+    # the offsets just past every '\n' in mm[start:stop]
+    def _scan(self, start, stop):
+        mm = self._mm
+        for a in range(start, stop, self.chunk_size):
+            b = min(stop, a + self.chunk_size)
+            if np is not None:
+                found = np.flatnonzero(np.frombuffer(mm, dtype=np.uint8, count=b - a, offset=a) == 10) + (a + 1)
+                yield found.astype(np.int64 if self._ends.typecode == 'q' else np.uint32).tobytes()
+            else:
+                yield array(self._ends.typecode, map(_end, _NEWLINE.finditer(mm, a, b))).tobytes()
+
+    # pick up whatever was appended to the file since the index was built (or everything, the first time).
+    # A file that grew is only taken as appended to when the end of what was indexed is still the same, like
+    # _load() checks for a saved index
+    def refresh(self):
+        st = self._map()
+        if st.st_size < self._size or (st.st_size == self._size and st.st_mtime_ns != self._mtime
+                                       and self._size) or (self._size and self._tail_crc(self._size) != self._crc):
+            # truncated or rewritten: start over
+            self._ends = array('I')
+            self._size = 0
+        if st.st_size == self._size and st.st_mtime_ns == self._mtime:
+            return self
+        if st.st_size >= 1 << 32 and self._ends.typecode != 'q':
+            self._ends = array('q', self._ends)
+        self.scanned = st.st_size - self._size
+        for block in self._scan(self._size, st.st_size):
+            self._ends.frombytes(block)
+        self._size = st.st_size
+        self._mtime = st.st_mtime_ns
+        self._crc = self._tail_crc(self._size)
+        if self.save_index:
+            self.save()
+        return self
+
+    def __len__(self):
+        ends = self._ends
+        last = ends[-1] if ends else 0
+        return len(ends) + (self._size > last)
+
+    def _span(self, i):
+        ends = self._ends
+        return ends[i - 1] if i else 0, ends[i] if i < len(ends) else self._size
+
+    def _decode(self, raw):
+        return raw if self.encoding is None else raw.decode(self.encoding, self.errors)
+
+    def __getitem__(self, i):
+        n = len(self)
+        if isinstance(i, slice):
+            start, stop, step = i.indices(n)
+            if step == 1:
+                return self._lines(start, stop)
+            return [self[j] for j in range(start, stop, step)]
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('line index out of range')
+        a, b = self._span(i)
+        return self._decode(self._mm[a:b])
+
+    # lines start..stop-1, sliced out of the map without a Python loop per line
+    def _lines(self, start, stop):
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+        ends = self._ends
+        stops = ends[start:stop]
+        if stop > len(ends):
+            stops.append(self._size)
+        starts = chain([ends[start - 1] if start else 0], stops[:-1])
+        raw = map(self._mm.__getitem__, map(slice, starts, stops))
+        if self.encoding is None:
+            return list(raw)
+        return list(map(methodcaller('decode', self.encoding, self.errors), raw))
+
+    def __iter__(self, block=4096):
+        for a in range(0, len(self), block):
+            yield from self._lines(a, a + block)
+
+    def __reversed__(self, block=4096):
+        for b in range(len(self), 0, -block):
+            yield from reversed(self._lines(max(0, b - block), b))
+
+    def close(self):
+        self._unmap()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(lines=2000000):
+    path = os.path.join(tempfile.gettempdir(), 'line_index_benchmark.log')
+    rand = random.Random(0)
+    with open(path, 'w') as f:
+        f.writelines('line {} {}\n'.format(i, 'x' * rand.randrange(80)) for i in range(lines))
+    if os.path.exists(path + '.lidx'):
+        os.remove(path + '.lidx')
+    size = os.path.getsize(path) / 1e6
+    picks = [rand.randrange(lines) for _ in range(100000)]
+
+    start = time.perf_counter()
+    with open(path) as f:
+        all_lines = f.readlines()
+    [all_lines[i] for i in picks]
+    print('readlines() + 100K lookups:       {:.2f}s for {:.0f} MB'.format(time.perf_counter() - start, size))
+    del all_lines
+
+    start = time.perf_counter()
+    with LineFile(path) as lf:
+        [lf[i] for i in picks]
+    print('LineFile, new index + 100K lookups: {:.2f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with LineFile(path) as lf:
+        [lf[i] for i in picks]
+        index_bytes = lf._ends.itemsize * len(lf._ends)
+    print('LineFile, saved index + lookups:    {:.2f}s, index is {:.1f} MB'.format(
+        time.perf_counter() - start, index_bytes / 1e6))
+
+    with open(path, 'a') as f:
+        f.writelines('appended {}\n'.format(i) for i in range(1000))
+    start = time.perf_counter()
+    with LineFile(path) as lf:
+        assert lf[-1] == 'appended 999\n' and len(lf) == lines + 1000
+        print('LineFile after an append:           {:.3f}s ({:,} bytes scanned)'.format(
+            time.perf_counter() - start, lf.scanned))
+    os.remove(path)
+    os.remove(path + '.lidx')
+
+
+if __name__ == '__main__':
+    path = os.path.join(tempfile.gettempdir(), 'line_index_example.txt')
+    with open(path, 'wt') as f:
+        f.write('first line\nsecond line\nthird line\nno newline at the end')
+    with LineFile(path, save=False) as lines:
+        print(len(lines), lines[1], lines[-1])
+        print(lines[1:3])
+        print(list(reversed(lines)))
+    os.remove(path)
+
+    benchmark()
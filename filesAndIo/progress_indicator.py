@@ -1,4 +1,6 @@
-import time, sys, random
+import time, sys, random, threading
+
+from progress_renderer import ProgressBoard, Renderer
 
 
 # progress indicator
@@ -43,6 +45,25 @@ def loading_mpb(count):
             print('[' + '#' * width + ' ' * (25 - width) + ']')
 
 
+# multiple progress bar, updated from worker threads. loading_mpb redraws every bar after every step; here
+# every thread only bumps its own counter and a Renderer redraws the bars that changed, 20 times a second
+def loading_mpb_threads(count):
+    board = ProgressBoard([100] * count)
+
+    def work(index):
+        for i in range(100):
+            time.sleep(random.random() / 20)
+            board.add(index)
+
+    with Renderer(board):
+        workers = [threading.Thread(target=work, args=(i,)) for i in range(count)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+
 # loading()
 # loading_pb()
 loading_mpb(5)
+# loading_mpb_threads(5)
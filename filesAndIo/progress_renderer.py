@@ -0,0 +1,160 @@
+import multiprocessing
+import shutil
+import sys
+import threading
+import time
+from array import array
+
+WIDTH = 25
+
+
+# The counters of many tasks, one slot per task. Every task only ever writes its own slot, so updates need no
+# lock: from threads a slot is a plain array element, and with shared=True the slots live in shared memory
+# (a RawArray, which has no lock either) so worker processes can update them too. Pass the board to the
+# processes when they are created
+class ProgressBoard:
+    def __init__(self, totals, shared=False):
+        if isinstance(totals, int):
+            raise TypeError('totals must be a list with the total of every task')
+        self.totals = array('q', totals)
+        n = len(self.totals)
+        self.counters = multiprocessing.RawArray('q', n) if shared else array('q', bytes(8 * n))
+
+    def __len__(self):
+        return len(self.totals)
+
+    def add(self, task, n=1):
+        self.counters[task] += n
+
+    def set(self, task, value):
+        self.counters[task] = value
+
+    def done(self):
+        return all(c >= t for c, t in zip(self.counters, self.totals))
+
+
+def _bar(count, total, label):
+    fraction = min(count / total, 1.0) if total else 1.0
+    width = int(fraction * WIDTH)
+    return '[' + '#' * width + ' ' * (WIDTH - width) + '] {:3d}% {}'.format(int(fraction * 100), label)
+
+
+# Draws a ProgressBoard from its own thread at a fixed frame rate, whatever the rate of updates is. A frame
+# only looks at the counters (one copy of the whole array to see if anything moved at all), rebuilds the lines
+# whose numbers changed and sends all of them to the terminal in one write, moving the cursor with escape
+# codes to just those lines. When there are more tasks than rows in the terminal, neighbouring tasks share
+# a bar that shows their sum
+class Renderer:
+    def __init__(self, board, fps=20, out=None, rows=None):
+        self.board = board
+        self.interval = 1 / fps
+        self.out = out if out is not None else sys.stdout
+        n = len(board)
+        if rows is None:
+            rows = max(1, shutil.get_terminal_size().lines - 2)
+        rows = min(rows, n)
+        self.group = -(-n // rows)
+        self.rows = -(-n // self.group)
+        g = self.group
+        self._slices = [(i * g, min(n, (i + 1) * g)) for i in range(self.rows)]
+        self._totals = [sum(board.totals[a:b]) for a, b in self._slices]
+        if g == 1:
+            self._labels = ['task {}'.format(a) for a, b in self._slices]
+        else:
+            self._labels = ['tasks {}-{}'.format(a, b - 1) for a, b in self._slices]
+        self._last = None
+        self._shown = [None] * self.rows
+        self._stop = threading.Event()
+        self._thread = None
+        self.frames = 0
+        self.cpu = 0.0
+
+    def start(self):
+        # room for the bars, with the cursor left on the line below them
+        self.out.write('\n'.join(_bar(0, t, l) for t, l in zip(self._totals, self._labels)) + '\n')
+        self.out.flush()
+        self._shown = [0] * self.rows
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.thread_time()
+        while not self._stop.wait(self.interval):
+            self.render()
+        self.render()
+        self.cpu = time.thread_time() - start
+
+    def render(self):
+        counters = self.board.counters
+        snapshot = bytes(memoryview(counters))
+        if snapshot == self._last:
+            return
+        self._last = snapshot
+        self.frames += 1
+        if self.group == 1:
+            sums = list(counters)
+        else:
+            sums = [sum(counters[a:b]) for a, b in self._slices]
+        parts = []
+        line = self.rows
+        shown = self._shown
+        for i, s in enumerate(sums):
+            if s == shown[i]:
+                continue
+            shown[i] = s
+            if i < line:
+                parts.append(u'\u001b[{}F'.format(line - i))
+            elif i > line:
+                parts.append(u'\u001b[{}E'.format(i - line))
+            parts.append(_bar(s, self._totals[i], self._labels[i]))
+            parts.append(u'\u001b[K')
+            line = i
+        if parts:
+            parts.append(u'\u001b[{}E'.format(self.rows - line))
+            self.out.write(''.join(parts))
+            self.out.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _work(board, tasks, steps, delay):
+    for _ in range(steps):
+        for t in tasks:
+            board.add(t)
+        time.sleep(delay)
+
+
+def benchmark(tasks=10000, steps=100, threads=8):
+    board = ProgressBoard([steps] * tasks)
+    per_thread = [range(i, tasks, threads) for i in range(threads)]
+    start = time.perf_counter()
+    with Renderer(board) as r:
+        workers = [threading.Thread(target=_work, args=(board, t, steps, 0.02)) for t in per_thread]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    elapsed = time.perf_counter() - start
+    print('{:,} tasks, {:.1f}s: {} frames, renderer cpu {:.3f}s ({:.2f}% of one core)'.format(
+        tasks, elapsed, r.frames, r.cpu, 100 * r.cpu / elapsed))
+
+
+if __name__ == '__main__':
+    board = ProgressBoard([100] * 5, shared=True)
+    with Renderer(board):
+        workers = [multiprocessing.Process(target=_work, args=(board, [i], 100, 0.01 * (i + 1))) for i in range(5)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    benchmark()
@@ -28,6 +28,7 @@ print(m.groups())
 text = 'Today is 11/27/2012. PyCon starts 3/13/2013'
 textR = re.sub(r'(\d+)/(\d+)/(\d+)', r'\3-\1-\2', text)
 print(textR)
+# for doing this over big files, chunk by chunk, see patterns.py (sub_file and rewrite_dates_file)
 
 # performing case-insensitive matching
 caseIText = 'UPPER PYTHON, lower python, Mixed Python';
@@ -0,0 +1,244 @@
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+# matchingSearch.py shows that compiling a pattern once (datepat = re.compile(...)) pays off when it is used a
+# lot. Named patterns are compiled once when they are registered and never dropped; any other pattern string
+# goes through a small LRU cache, so a program that builds patterns on the fly still compiles each one once.
+# re keeps its own cache too, but it is small and shared by everything in the process, and it says nothing
+# about how well it is doing; this one reports hits and misses like functools.lru_cache does.
+# Named patterns are only looked up with registry[name]. Everywhere else a string is a pattern, so
+# registry.search('date', text) looks for the word 'date', whatever is registered under that name
+class PatternRegistry:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._named = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def register(self, name, pattern, flags=0):
+        self._named[name] = re.compile(pattern, flags)
+        return self._named[name]
+
+    def __getitem__(self, name):
+        return self._named[name]
+
+    def __contains__(self, name):
+        return name in self._named
+
+    def names(self):
+        return list(self._named)
+
+    def compile(self, pattern, flags=0):
+        if isinstance(pattern, re.Pattern):
+            return pattern
+        key = (type(pattern), pattern, flags)
+        with self._lock:
+            compiled = self._cache.get(key)
+            if compiled is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return compiled
+            self._misses += 1
+        compiled = re.compile(pattern, flags)
+        with self._lock:
+            self._cache[key] = compiled
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return compiled
+
+    # these take a pattern string (compiled through the cache) or a compiled pattern, like the re functions
+    def match(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).match(string)
+
+    def search(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).search(string)
+
+    def findall(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).findall(string)
+
+    def sub(self, pattern, repl, string, count=0, flags=0):
+        return self.compile(pattern, flags).sub(repl, string, count)
+
+    def stats(self):
+        return CacheInfo(self._hits, self._misses, self.maxsize, len(self._cache))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._hits = self._misses = 0
+
+
+registry = PatternRegistry()
+registry.register('date', r'(\d+)/(\d+)/(\d+)')
+registry.register('date_bytes', rb'(\d+)/(\d+)/(\d+)')
+
+
+# (start, end, replacement) for every match of pattern in buf from pos on
+def _regex_matches(pattern, repl):
+    if callable(repl):
+        return lambda buf, pos: ((m.start(), m.end(), repl(m)) for m in pattern.finditer(buf, pos))
+    return lambda buf, pos: ((m.start(), m.end(), m.expand(repl)) for m in pattern.finditer(buf, pos))
+
+
+# Run a substitution over a stream of chunks (str or bytes) and yield the rewritten text piece by piece.
+# A match is only replaced once it ends at least `margin` characters before the end of what has been read,
+# so a match that straddles two chunks is seen whole in the next round. The text before the part that is
+# carried over is kept too (up to `margin` characters), so lookbehinds and \b see the same context they
+# would see in the whole text. A single match longer than margin can still be cut in two
+def _stream_sub(matches, chunks, margin):
+    buf = None
+    pos = 0
+    for chunk in chunks:
+        buf = chunk if buf is None else buf + chunk
+        limit = len(buf) - margin
+        if limit <= pos:
+            continue
+        out, last, cut = [], pos, limit
+        for start, end, replacement in matches(buf, pos):
+            if end > limit:
+                cut = min(start, limit)
+                break
+            out.append(buf[last:start])
+            out.append(replacement)
+            last = end
+        out.append(buf[last:cut])
+        yield buf[:0].join(out)
+        keep = max(0, cut - margin)
+        buf = buf[keep:]
+        pos = cut - keep
+    if buf is not None:
+        out, last = [], pos
+        for start, end, replacement in matches(buf, pos):
+            out.append(buf[last:start])
+            out.append(replacement)
+            last = end
+        out.append(buf[last:])
+        yield buf[:0].join(out)
+
+
+def sub_chunks(pattern, repl, chunks, margin=4096, flags=0):
+    return _stream_sub(_regex_matches(registry.compile(pattern, flags), repl), chunks, margin)
+
+
+def _read_chunks(f, chunk_size):
+    return iter(lambda: f.read(chunk_size), b'')
+
+
+def _sub_file(matches, src, dst, chunk_size, margin):
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        for piece in _stream_sub(matches, _read_chunks(fin, chunk_size), margin):
+            fout.write(piece)
+
+
+# re.sub over a whole file without reading it all into memory. The file is read as bytes, so a str pattern or
+# replacement is encoded first (a compiled str pattern too, e.g. registry['date'])
+def sub_file(pattern, repl, src, dst, chunk_size=1 << 22, margin=4096, flags=0):
+    if isinstance(pattern, str):
+        pattern = pattern.encode()
+    compiled = registry.compile(pattern, flags)
+    if isinstance(compiled.pattern, str):
+        compiled = registry.compile(compiled.pattern.encode(), compiled.flags & ~re.UNICODE)
+    if isinstance(repl, str):
+        repl = repl.encode()
+    _sub_file(_regex_matches(compiled, repl), src, dst, chunk_size, margin)
+
+
+# The date rewrite from matchingSearch.py, re.sub(r'(\d+)/(\d+)/(\d+)', r'\3-\1-\2', text), gives the same
+# result as this, but it is slow on big inputs: re tries (\d+) at every digit in the text. A pattern that
+# starts with a literal is searched for much faster, so this looks for '/day/year' and then walks back over
+# the digits of the month. The month may not reach into the previous match, just like with re.sub
+_DAY_YEAR = {str: re.compile(r'/(\d+)/(\d+)'), bytes: re.compile(rb'/(\d+)/(\d+)')}
+_BYTE_DIGITS = frozenset(b'0123456789')
+
+
+def _date_matches(buf, pos):
+    if isinstance(buf, str):
+        find, is_digit, dash = _DAY_YEAR[str].search, str.isdecimal, '-'
+    else:
+        find, is_digit, dash = _DAY_YEAR[bytes].search, _BYTE_DIGITS.__contains__, b'-'
+    m = find(buf, pos)
+    while m is not None:
+        slash = m.start()
+        start = slash
+        while start > pos and is_digit(buf[start - 1]):
+            start -= 1
+        if start == slash:
+            m = find(buf, slash + 1)
+            continue
+        yield start, m.end(), dash.join((m.group(2), buf[start:slash], m.group(1)))
+        pos = m.end()
+        m = find(buf, pos)
+
+
+def rewrite_dates(text):
+    return text[:0].join(_stream_sub(_date_matches, [text], 0))
+
+
+def rewrite_dates_file(src, dst, chunk_size=1 << 22, margin=4096):
+    _sub_file(_date_matches, src, dst, chunk_size, margin)
+
+
+def benchmark(lines=500000):
+    path = os.path.join(tempfile.gettempdir(), 'patterns_benchmark.log')
+    out = path + '.out'
+    with open(path, 'wb') as f:
+        for i in range(lines):
+            f.write(b'host%d GET /api/v1/items/%d 200 %dms user=%d' % (i % 50, i, i % 300, i % 999))
+            f.write(b' on %d/%d/20%02d\n' % (i % 12 + 1, i % 28 + 1, i % 100) if i % 20 == 0 else b'\n')
+    size = os.path.getsize(path) / 1e6
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    # a pattern string per call: re has to look it up in its own cache every time
+    start = time.perf_counter()
+    for line in data.splitlines():
+        re.match(rb'\d+/\d+/\d+', line)
+    print('re.match(string) per line:   {:.2f}s'.format(time.perf_counter() - start))
+    start = time.perf_counter()
+    datepat = registry['date_bytes']
+    for line in data.splitlines():
+        datepat.match(line)
+    print('registered pattern per line: {:.2f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    expected = re.sub(rb'(\d+)/(\d+)/(\d+)', rb'\3-\1-\2', data)
+    elapsed = time.perf_counter() - start
+    print('re.sub on the whole file:    {:.2f}s, {:.0f} MB/s'.format(elapsed, size / elapsed))
+
+    start = time.perf_counter()
+    sub_file(registry['date_bytes'], rb'\3-\1-\2', path, out, chunk_size=1 << 20)
+    elapsed = time.perf_counter() - start
+    print('sub_file, 1 MB chunks:       {:.2f}s, {:.0f} MB/s'.format(elapsed, size / elapsed))
+    with open(out, 'rb') as f:
+        assert f.read() == expected
+
+    start = time.perf_counter()
+    rewrite_dates_file(path, out, chunk_size=1 << 20)
+    elapsed = time.perf_counter() - start
+    print('rewrite_dates_file:          {:.2f}s, {:.0f} MB/s'.format(elapsed, size / elapsed))
+    with open(out, 'rb') as f:
+        assert f.read() == expected
+    os.remove(path)
+    os.remove(out)
+
+
+if __name__ == '__main__':
+    text = 'Today is 11/27/2012. PyCon starts 3/13/2013'
+    print(registry['date'].sub(r'\3-\1-\2', text))
+    print(rewrite_dates(text))
+    print(''.join(sub_chunks(registry['date'], r'\3-\1-\2', ['Today is 11/2', '7/2012. PyCon starts 3/', '13/2013'], margin=8)))
+
+    for word in ['python', 'java', 'python', 'python']:
+        registry.findall(word, 'UPPER PYTHON, lower python, Mixed Python', re.IGNORECASE)
+    print(registry.stats())
+
+    benchmark()
@@ -2,16 +2,12 @@ text = 'pýtĥöñ\fis\tawesome\r\n'
 
 # Making a traslation table from the sys and unicode data modules
 import unicodedata
-import sys
 
-cmb_chrs = dict.fromkeys(c for c in range(sys.maxunicode)
-if unicodedata.combining(chr(c)))
+# building the table means calling unicodedata.combining() on every code point; sanitizer.py does that once
+# and keeps the result on disk, so loading it here is quick
+from sanitizer import combining_table, remap
 
-remap = {
-    ord('\t'): ' ',
-    ord('\f'): ' ',
-    ord('\r'): None # Deleted
-}
+cmb_chrs = combining_table()
 
 b = unicodedata.normalize('NFD', text)
 c = b.translate(cmb_chrs)
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unicodedata
+
+# sanitize.py builds its table of combining characters by calling unicodedata.combining() on every code
+# point, which is over a million calls every time the script starts. The table only changes when the Unicode
+# database does, so here it is built once, saved as a list of code point ranges in a file named after
+# unicodedata.unidata_version, and loaded from that file from then on.
+_CACHE_NAME = 'combining-{}.json'.format(unicodedata.unidata_version)
+_table = None
+_sanitize_table = None
+
+
+def _cache_paths():
+    yield os.path.join(os.path.dirname(os.path.abspath(__file__)), '.' + _CACHE_NAME)
+    yield os.path.join(tempfile.gettempdir(), 'python_notes-' + _CACHE_NAME)
+
+
+def _build_ranges():
+    ranges = []
+    for c in range(sys.maxunicode + 1):
+        if unicodedata.combining(chr(c)):
+            if ranges and ranges[-1][1] == c - 1:
+                ranges[-1][1] = c
+            else:
+                ranges.append([c, c])
+    return ranges
+
+
+def _load_ranges():
+    for path in _cache_paths():
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            continue
+    ranges = _build_ranges()
+    for path in _cache_paths():
+        try:
+            tmp = path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(ranges, f)
+            os.replace(tmp, path)
+            break
+        except OSError:
+            continue
+    return ranges
+
+
+# the translate() table that deletes combining characters, like cmb_chrs in sanitize.py
+def combining_table():
+    global _table
+    if _table is None:
+        _table = dict.fromkeys(c for start, end in _load_ranges() for c in range(start, end + 1))
+    return _table
+
+
+remap = {
+    ord('\t'): ' ',
+    ord('\f'): ' ',
+    ord('\r'): None  # Deleted
+}
+
+
+# one table for both steps, so each line is only translated once
+def sanitize_table():
+    global _sanitize_table
+    if _sanitize_table is None:
+        table = dict(combining_table())
+        table.update(remap)
+        _sanitize_table = table
+    return _sanitize_table
+
+
+def _clean(line, table):
+    # an ASCII line has nothing to decompose and no combining characters, so plain replace() is enough
+    if line.isascii():
+        return line.replace('\t', ' ').replace('\f', ' ').replace('\r', '')
+    return unicodedata.normalize('NFD', line).translate(table)
+
+
+def sanitize_text(text):
+    return _clean(text, sanitize_table())
+
+
+# clean an iterable of lines (a file, sys.stdin, a list...) lazily, one line at a time
+def sanitize(lines):
+    table = sanitize_table()
+    for line in lines:
+        yield _clean(line, table)
+
+
+def sanitize_file(src, dst, encoding='utf-8'):
+    with open(src, encoding=encoding, newline='') as fin, open(dst, 'w', encoding=encoding, newline='') as fout:
+        fout.writelines(sanitize(fin))
+
+
+def benchmark(lines=200000):
+    # mostly plain ASCII log lines with some accented ones mixed in
+    text = ['pýtĥöñ\fis\tawesome, ¿verdad? Ça va très bien {}\r\n'.format(i) if i % 10 == 0 else
+            'python\fis\tawesome, request {} took {} ms\r\n'.format(i, i % 300) for i in range(lines)]
+    size = sum(len(line.encode()) for line in text)
+    start = time.perf_counter()
+    for _ in sanitize(text):
+        pass
+    elapsed = time.perf_counter() - start
+    print('sanitize: {:.1f} MB in {:.2f}s, {:.1f} MB/s'.format(size / 1e6, elapsed, size / 1e6 / elapsed))
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    combining_table()
+    print('combining table ready in {:.1f}ms'.format((time.perf_counter() - start) * 1000))
+    print(sanitize_text('pýtĥöñ\fis\tawesome\r\n'))
+    benchmark()
@@ -21,3 +21,5 @@ joinedString = ''.join(v+d for v, d in zip(values, delimiters))
 noSeperatorGroup = re.split(r'(?:,|;|\s)\s*', line)
 print(noSeperatorGroup)
 
+
+# tokenizer.py does the same split on bytes, keeping offsets into the original data instead of new strings
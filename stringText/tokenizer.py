@@ -0,0 +1,224 @@
+import os
+import re
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from functools import partial
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# split.py's separator, r'(;|,|\s)\s*', as bytes, except that the extra whitespace never runs past the end of a
+# line. That way a whole file (or a chunk of it) splits exactly like every line would split on its own, and a
+# delimiter that ends in '\n' ends a line
+DELIMITERS = re.compile(rb'\n|[;,\t\x0b\x0c\r ][\t\x0b\x0c\r ]*\n?')
+
+_span = re.Match.span
+
+if np is not None:
+    _is_delim = np.zeros(256, dtype=bool)
+    _is_delim[list(b';,\t\n\x0b\x0c\r ')] = True
+    _is_space = np.zeros(256, dtype=bool)
+    _is_space[list(b'\t\n\x0b\x0c\r ')] = True
+
+
+# every token and delimiter as an offset into data: token i is data[b[2i]:b[2i+1]] and the delimiter after it is
+# data[b[2i+1]:b[2i+2]]. The last token has no delimiter after it
+def _bounds_re(data, pattern):
+    bounds = array('q', [0])
+    bounds.extend(chain.from_iterable(map(_span, pattern.finditer(data))))
+    bounds.append(len(data))
+    return bounds
+
+
+# the same bounds as _bounds_re(data, DELIMITERS) without a match object per delimiter. A delimiter starts at
+# every delimiter byte that does not continue the one before it, and a byte continues a delimiter when it is
+# whitespace and the byte before it is a delimiter byte other than '\n'
+def _bounds_np(data):
+    raw = np.frombuffer(data, dtype=np.uint8)
+    bounds = np.empty(0, dtype=np.int64)
+    if len(raw):
+        delim = _is_delim[raw]
+        cont = np.zeros(len(raw), dtype=bool)
+        cont[1:] = _is_space[raw[1:]] & delim[:-1] & (raw[:-1] != 10)
+        starts = np.flatnonzero(delim & ~cont)
+        last = delim & np.append(~cont[1:], True)
+        ends = np.flatnonzero(last) + 1
+        bounds = np.empty(2 * len(starts), dtype=np.int64)
+        bounds[0::2] = starts
+        bounds[1::2] = ends
+    result = array('q', [0])
+    result.frombytes(bounds.tobytes())
+    result.append(len(raw))
+    return result
+
+
+# The result of tokenize(): the data it was given plus one array of offsets. Nothing is copied until it is
+# asked for: tokens and delimiters come out as memoryview slices of the original data, and bytes are only made
+# by values()/delimiters() or by the caller
+class Tokens:
+    def __init__(self, data, bounds):
+        self.data = memoryview(data)
+        self.bounds = bounds
+        self._lines = None
+
+    def __len__(self):
+        return len(self.bounds) // 2
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('token index out of range')
+        return self.data[self.bounds[2 * i]:self.bounds[2 * i + 1]]
+
+    def delimiter(self, i):
+        b = self.bounds
+        if 2 * i + 2 >= len(b):
+            return self.data[0:0]
+        return self.data[b[2 * i + 1]:b[2 * i + 2]]
+
+    def span(self, i):
+        return self.bounds[2 * i], self.bounds[2 * i + 1]
+
+    def __iter__(self):
+        b = self.bounds
+        return map(self.data.__getitem__, map(slice, b[0::2], b[1::2]))
+
+    # fields[::2] and fields[1::2] + [''] from split.py, as lists of bytes
+    def values(self):
+        b = self.bounds
+        return list(map(bytes, map(self.data.__getitem__, map(slice, b[0::2], b[1::2]))))
+
+    def delimiters(self):
+        b = self.bounds
+        return list(map(bytes, map(self.data.__getitem__, map(slice, b[1::2], b[2::2])))) + [b'']
+
+    # the original bytes, or the same line with other values between the same delimiters
+    def join(self, values=None):
+        if values is None:
+            return self.data[self.bounds[0]:self.bounds[-1]].tobytes()
+        return b''.join(chain.from_iterable(zip(values, self.delimiters())))
+
+    # token numbers where every line starts; a line ends with the delimiter that holds its '\n'
+    def line_starts(self):
+        if self._lines is None:
+            b = self.bounds
+            size = b[-1]
+            if np is not None:
+                raw = np.frombuffer(self.data, dtype=np.uint8)
+                after = np.flatnonzero(raw == 10) + 1
+                after = after[after < size]
+                starts = np.frombuffer(b, dtype=np.int64)[0::2]
+                found = np.searchsorted(starts, after)
+                lines = array('q', [0])
+                lines.frombytes(found.astype(np.int64).tobytes())
+            else:
+                after = [m.end() for m in re.finditer(rb'\n', self.data)]
+                lines = array('q', [0])
+                lines.extend(map(partial(bisect_left, b[0::2]), (p for p in after if p < size)))
+            self._lines = lines
+        return self._lines
+
+    def line_count(self):
+        return len(self.line_starts())
+
+    # the tokens of line i, as a range of token numbers. When the data ends with '\n' the empty token after it
+    # belongs to no line
+    def line_tokens(self, i):
+        lines = self.line_starts()
+        if i + 1 < len(lines):
+            end = lines[i + 1]
+        else:
+            end = len(self)
+            if self.bounds[-1] and self.data[self.bounds[-1] - 1] == 10:
+                end -= 1
+        return range(lines[i], end)
+
+    def line(self, i):
+        r = self.line_tokens(i)
+        end = self.bounds[2 * r.stop] if r.stop < len(self) else self.bounds[-1]
+        return self.data[self.bounds[2 * r.start]:end]
+
+
+def tokenize(data, pattern=None):
+    if isinstance(data, str):
+        data = data.encode()
+    if pattern is None or pattern is DELIMITERS:
+        bounds = _bounds_np(data) if np is not None else _bounds_re(data, DELIMITERS)
+    else:
+        bounds = _bounds_re(data, pattern)
+    return Tokens(data, bounds)
+
+
+# Tokenize a file a chunk of whole lines at a time. Every chunk is one Tokens, so there is no Python code run per
+# line or per token; a line longer than chunk_size just makes its chunk bigger
+def tokenize_file(path, chunk_size=1 << 22, pattern=None):
+    with open(path, 'rb') as f:
+        rest = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            data = rest + chunk
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                rest = data
+                continue
+            rest = data[cut:]
+            yield tokenize(memoryview(data)[:cut], pattern)
+        if rest:
+            yield tokenize(rest, pattern)
+
+
+def benchmark(lines=500000):
+    line = 'java, c++, c,  python; js,html, php  old'
+    text = '\n'.join(line + ' ' + str(i) for i in range(lines)) + '\n'
+    data = text.encode()
+    path = os.path.join(tempfile.gettempdir(), 'tokenizer_benchmark.txt')
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    start = time.perf_counter()
+    count = 0
+    for l in text.splitlines():
+        fields = re.split(r'(;|,|\s)\s*', l)
+        values = fields[::2]
+        delimiters = fields[1::2] + ['']
+        ''.join(v + d for v, d in zip(values, delimiters))
+        count += len(values)
+    print('re.split per line:      {:.2f}s, {:,} tokens'.format(time.perf_counter() - start, count))
+
+    start = time.perf_counter()
+    count = 0
+    rebuilt = []
+    for tokens in tokenize_file(path):
+        count += len(tokens)
+        rebuilt.append(tokens.join())
+    print('tokenize_file:          {:.2f}s, {:,} tokens'.format(time.perf_counter() - start, count))
+    assert b''.join(rebuilt) == data
+
+    if np is not None:
+        # what tokenize() does without NumPy
+        start = time.perf_counter()
+        bounds = _bounds_re(data, DELIMITERS)
+        print('regex offsets only:     {:.2f}s'.format(time.perf_counter() - start))
+        assert bounds == tokenize(data).bounds
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    line = b'java, c++, c,  python; js,html, php  old'
+    tokens = tokenize(line)
+    print([bytes(t) for t in tokens])
+    print(tokens.values())
+    print(tokens.delimiters())
+    print(tokens.join() == line)
+    print(tokens.join([v.upper() for v in tokens.values()]))
+
+    benchmark()